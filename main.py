@@ -12,6 +12,7 @@ load_dotenv()
 bot = Glyph(
     database_url=environ.get("DATABASE_URL"),
     test_mode=bool(int(environ.get("TEST_MODE", 0))),
+    replica_url=environ.get("DATABASE_REPLICA_URL") or None,
 )
 bot.remove_command("help")
 
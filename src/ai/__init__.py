@@ -0,0 +1,29 @@
+from src.ai.batching import InferenceBatcher
+from src.ai.cache import VerdictCache, content_key, normalize_content
+from src.ai.config import AiConfig
+from src.ai.prefilter import Decision, KeywordTrie, PreFilter
+from src.ai.pipeline import Pipeline, Stage
+from src.ai.reports import ReportSender
+from src.ai.scheduler import ScanScheduler
+from src.ai.model import ModelRegistry, current_rss, is_toxic, score_prediction
+from src.ai.workers import ProcessInferencePool
+
+__all__ = (
+    "AiConfig",
+    "Decision",
+    "InferenceBatcher",
+    "KeywordTrie",
+    "ModelRegistry",
+    "Pipeline",
+    "PreFilter",
+    "ProcessInferencePool",
+    "ReportSender",
+    "ScanScheduler",
+    "Stage",
+    "VerdictCache",
+    "content_key",
+    "current_rss",
+    "is_toxic",
+    "normalize_content",
+    "score_prediction",
+)
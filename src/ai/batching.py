@@ -0,0 +1,132 @@
+from __future__ import annotations
+from asyncio import (
+    Future,
+    Queue,
+    Semaphore,
+    Task,
+    TimeoutError,
+    create_task,
+    get_running_loop,
+    wait_for,
+)
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Optional
+
+
+logger = getLogger(__name__)
+
+BatchPredictor = Callable[[list[str]], Awaitable[list[dict[str, float]]]]
+
+
+class InferenceBatcher:
+    """collects texts from concurrent scans and scores them together in a single model call.
+
+    a batch is flushed as soon as it holds `max_batch_size` texts or `max_delay` seconds have
+    passed since its first text arrived, whichever comes first. each caller gets back only its own result.
+    """
+
+    __slots__ = (
+        "predict_batch",
+        "max_batch_size",
+        "max_delay",
+        "queue",
+        "_task",
+        "_slots",
+        "_flushes",
+        "batches",
+        "items",
+        "largest_batch",
+    )
+
+    def __init__(
+        self,
+        predict_batch: BatchPredictor,
+        max_batch_size: int = 32,
+        max_delay: float = 0.005,
+        max_queue: int = 1024,
+        concurrency: int = 1,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_delay = max_delay
+        self.queue: Queue[tuple[str, Future[dict[str, float]]]] = Queue(maxsize=max_queue)
+        self._task: Optional[Task[None]] = None
+        # how many batches may be in the model at once, e.g. one per worker process
+        self._slots = Semaphore(max(concurrency, 1))
+        self._flushes: set[Task[None]] = set()
+        self.batches: int = 0
+        self.items: int = 0
+        self.largest_batch: int = 0
+
+    async def submit(self, content: str) -> dict[str, float]:
+        """queues a text for the next batch and waits for its score.
+
+        waits for room when the queue is full, so a flood applies backpressure instead of growing memory.
+        """
+        if self._task is None or self._task.done():
+            self._task = create_task(self._run())
+        future: Future[dict[str, float]] = get_running_loop().create_future()
+        await self.queue.put((content, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[str, Future[dict[str, float]]]]:
+        batch = [await self.queue.get()]
+        deadline = get_running_loop().time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            # drain whatever is already waiting without yielding to the loop
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await wait_for(self.queue.get(), remaining))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            await self._slots.acquire()
+            flush = create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[str, Future[dict[str, float]]]]) -> None:
+        try:
+            results = await self.predict_batch([content for content, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        for (_, future), result in zip(batch, results):
+            # the waiting scan may have been cancelled in the meantime
+            if not future.done():
+                future.set_result(result)
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for flush in self._flushes:
+            flush.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self.queue.qsize(),
+        }
+
+    def __repr__(self):
+        return f"<InferenceBatcher(max_batch_size={self.max_batch_size}, max_delay={self.max_delay})>"
@@ -0,0 +1,157 @@
+"""offline benchmark and evaluation for the AI moderation model.
+
+streams a labeled corpus through the same scoring path the bot uses and reports
+throughput, latency, memory and per-label precision/recall.
+
+    python -m src.ai.bench corpus.jsonl --batch-sizes 1,8,32,128
+
+the corpus is either JSONL with a `text` field and a `label` or `labels` field, or CSV
+with `text` and `label` columns, where multiple labels are separated by `|`. labels are
+written without the `__label__` prefix, like `non_toxic` or `obscene`.
+"""
+from __future__ import annotations
+from argparse import ArgumentParser
+from collections import Counter
+from csv import DictReader
+from itertools import islice
+from json import loads
+from resource import RUSAGE_SELF, getrusage
+from time import perf_counter
+from typing import Any, Iterator, Optional
+
+from src.ai.config import AiConfig
+from src.ai.model import ModelRegistry, is_toxic
+from src.metrics import LatencyTracker
+
+
+# the pseudo-label for the bot's actual decision, the `non_toxic < 0.5` rule
+FLAGGED = "flagged"
+
+
+def read_corpus(path: str, limit: Optional[int] = None) -> Iterator[tuple[str, set[str]]]:
+    """streams (text, gold labels) pairs from a JSONL or CSV corpus without loading it all."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows: Iterator[dict[str, Any]] = iter(DictReader(f))
+        else:
+            rows = (loads(line) for line in f if line.strip())
+        for row in islice(rows, limit):
+            labels = row.get("labels") or row.get("label") or ()
+            if isinstance(labels, str):
+                labels = labels.split("|")
+            yield row["text"], {label.replace("__label__", "") for label in labels}
+
+
+def batched(items: Iterator[Any], size: int) -> Iterator[list[Any]]:
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+class Evaluation:
+    """per-label confusion counts. a label counts as predicted when its probability is at least `threshold`."""
+
+    __slots__ = ("threshold", "true_positives", "false_positives", "false_negatives")
+
+    def __init__(self, threshold: float = 0.5):
+        self.threshold = threshold
+        self.true_positives: Counter[str] = Counter()
+        self.false_positives: Counter[str] = Counter()
+        self.false_negatives: Counter[str] = Counter()
+
+    def add(self, score: dict[str, float], gold: set[str]) -> None:
+        predicted = {label for label, probability in score.items() if probability >= self.threshold}
+        if is_toxic(score):
+            predicted.add(FLAGGED)
+        if gold and "non_toxic" not in gold:
+            gold = gold | {FLAGGED}
+        for label in predicted & gold:
+            self.true_positives[label] += 1
+        for label in predicted - gold:
+            self.false_positives[label] += 1
+        for label in gold - predicted:
+            self.false_negatives[label] += 1
+
+    def report(self) -> dict[str, dict[str, float]]:
+        labels = set(self.true_positives) | set(self.false_positives) | set(self.false_negatives)
+        results = {}
+        for label in sorted(labels):
+            tp = self.true_positives[label]
+            fp = self.false_positives[label]
+            fn = self.false_negatives[label]
+            results[label] = {
+                "precision": tp / (tp + fp) if tp + fp else 0.0,
+                "recall": tp / (tp + fn) if tp + fn else 0.0,
+                "support": tp + fn,
+            }
+        return results
+
+
+def run(
+    registry: ModelRegistry, path: str, batch_size: int, limit: Optional[int] = None
+) -> tuple[dict[str, float], Evaluation]:
+    """scores the whole corpus with one batch size.
+
+    Returns:
+        tuple[dict[str, float], Evaluation]: throughput and latency figures, and the evaluation counts.
+    """
+    latency = LatencyTracker(window=100_000)
+    evaluation = Evaluation()
+    messages = 0
+    started = perf_counter()
+    for batch in batched(read_corpus(path, limit), batch_size):
+        batch_started = perf_counter()
+        scores = registry.predict_batch([text for text, _ in batch])
+        elapsed = perf_counter() - batch_started
+        # every message in a batch waits for the whole batch
+        for _ in batch:
+            latency.record(elapsed)
+        for score, (_, gold) in zip(scores, batch):
+            evaluation.add(score, gold)
+        messages += len(batch)
+    total = perf_counter() - started
+    return {
+        "messages": messages,
+        "seconds": total,
+        "per_second": messages / total if total else 0.0,
+        **latency.summary(),
+    }, evaluation
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m src.ai.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", help="labeled JSONL or CSV corpus")
+    parser.add_argument("--model", default=AiConfig.from_env().model_path, help="model to benchmark")
+    parser.add_argument(
+        "--batch-sizes", default="1", help="comma separated batch sizes to sweep, e.g. 1,8,32"
+    )
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N messages")
+    options = parser.parse_args(args)
+
+    registry = ModelRegistry(options.model)
+    registry.load()
+    print(f"model: {registry.path}")
+    print(f"load time: {registry.load_time:.2f}s, model memory: {registry.memory / 1024 / 1024:.1f} MiB")
+    print()
+    print(f"{'batch':>6} {'msgs':>8} {'msg/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    evaluation = None
+    for batch_size in (int(size) for size in options.batch_sizes.split(",")):
+        result, evaluation = run(registry, options.corpus, batch_size, options.limit)
+        print(
+            f"{batch_size:>6} {result['messages']:>8} {result['per_second']:>10.1f} "
+            f"{result['p50'] * 1000:>8.2f} {result['p95'] * 1000:>8.2f} {result['p99'] * 1000:>8.2f}"
+        )
+
+    # linux reports kilobytes here
+    print(f"\npeak rss: {getrusage(RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB\n")
+
+    if evaluation:
+        print(f"{'label':>16} {'precision':>10} {'recall':>10} {'support':>8}")
+        for label, figures in evaluation.report().items():
+            print(
+                f"{label:>16} {figures['precision']:>10.3f} {figures['recall']:>10.3f} {figures['support']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
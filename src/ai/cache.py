@@ -0,0 +1,69 @@
+from __future__ import annotations
+from hashlib import blake2b
+from re import compile
+from sys import getsizeof
+from typing import Any, Optional
+from cachetools import TTLCache
+
+
+ZERO_WIDTH = compile("[\u00ad\u180e\u200b-\u200f\u2060-\u2064\ufeff]")
+WHITESPACE = compile(r"\s+")
+
+
+def normalize_content(content: str) -> str:
+    """case-folds, strips zero-width characters and collapses whitespace so trivial variations of a message match."""
+    return WHITESPACE.sub(" ", ZERO_WIDTH.sub("", content)).strip().casefold()
+
+
+def content_key(content: str) -> bytes:
+    """a short fixed-size hash of the normalized content, so cached texts don't have to be stored."""
+    return blake2b(normalize_content(content).encode(), digest_size=16).digest()
+
+
+def _verdict_size(score: dict[str, float]) -> int:
+    # the dict, its label strings and float values, plus the 16-byte key
+    return getsizeof(score) + sum(getsizeof(label) + 24 for label in score) + 49
+
+
+class VerdictCache:
+    """remembers model scores for recently seen content.
+
+    entries expire after `ttl` seconds, and the least recently used ones are evicted
+    once the cache holds more than `max_memory` bytes. the returned dicts are shared, don't mutate them.
+    """
+
+    __slots__ = ("_cache", "hits", "misses")
+
+    def __init__(self, max_memory: int = 8 * 1024 * 1024, ttl: float = 600.0):
+        self._cache: TTLCache[bytes, dict[str, float]] = TTLCache(
+            maxsize=max_memory, ttl=ttl, getsizeof=_verdict_size
+        )
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: bytes) -> Optional[dict[str, float]]:
+        score = self._cache.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def put(self, key: bytes, score: dict[str, float]) -> None:
+        self._cache[key] = score
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "memory": self._cache.currsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        return f"<VerdictCache(entries={len(self._cache)}, hits={self.hits}, misses={self.misses})>"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from os import environ
+from typing import Optional
+
+
+@dataclass
+class AiConfig:
+    """runtime settings for AI moderation. every field can be set with an `AI_*` environment variable."""
+
+    model_path: str = "src/cogs/model.bin"
+    # seconds between checks for a new model file on disk. 0 disables the watcher.
+    model_watch_interval: float = 0.0
+    # largest number of messages scored in one model call. 1 disables batching.
+    batch_size: int = 32
+    # longest time a message waits for its batch to fill up, in milliseconds
+    batch_delay: float = 5.0
+    # messages allowed to wait for a batch before new scans have to wait for room
+    batch_queue_size: int = 1024
+    # worker processes used for inference. 0 runs predictions on the bot's thread pool instead.
+    workers: int = 0
+    # memory the verdict cache may use, in megabytes. 0 disables the cache.
+    cache_size: float = 8.0
+    # seconds a cached verdict stays valid
+    cache_ttl: float = 600.0
+    # messages with fewer word characters than this are never scanned
+    min_length: int = 3
+    # file with one keyword per line that is flagged without running the model
+    keywords_file: Optional[str] = None
+    # messages that may be waiting on the model at the same time across all guilds
+    scan_concurrency: int = 64
+    # guild settings lookups that may run at the same time
+    gate_concurrency: int = 16
+    # scans a single guild may have waiting before the overload policy kicks in
+    scan_guild_queue_size: int = 100
+    # scans that may be waiting across all guilds
+    scan_queue_size: int = 5000
+    # what to drop when full, "drop_oldest" or "drop_newest"
+    overload_policy: str = "drop_oldest"
+    # seconds flagged messages are collected for guilds that use digest reports
+    digest_window: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> AiConfig:
+        """builds the config from environment variables, using the defaults for anything unset."""
+        return cls(
+            model_path=environ.get("AI_MODEL_PATH", cls.model_path),
+            model_watch_interval=float(
+                environ.get("AI_MODEL_WATCH_INTERVAL", cls.model_watch_interval)
+            ),
+            batch_size=int(environ.get("AI_BATCH_SIZE", cls.batch_size)),
+            batch_delay=float(environ.get("AI_BATCH_DELAY", cls.batch_delay)),
+            batch_queue_size=int(
+                environ.get("AI_BATCH_QUEUE_SIZE", cls.batch_queue_size)
+            ),
+            workers=int(environ.get("AI_WORKERS", cls.workers)),
+            cache_size=float(environ.get("AI_CACHE_SIZE", cls.cache_size)),
+            cache_ttl=float(environ.get("AI_CACHE_TTL", cls.cache_ttl)),
+            min_length=int(environ.get("AI_MIN_LENGTH", cls.min_length)),
+            keywords_file=environ.get("AI_KEYWORDS_FILE") or None,
+            scan_concurrency=int(
+                environ.get("AI_SCAN_CONCURRENCY", cls.scan_concurrency)
+            ),
+            gate_concurrency=int(
+                environ.get("AI_GATE_CONCURRENCY", cls.gate_concurrency)
+            ),
+            scan_guild_queue_size=int(
+                environ.get("AI_SCAN_GUILD_QUEUE_SIZE", cls.scan_guild_queue_size)
+            ),
+            scan_queue_size=int(environ.get("AI_SCAN_QUEUE_SIZE", cls.scan_queue_size)),
+            overload_policy=environ.get("AI_OVERLOAD_POLICY", cls.overload_policy),
+            digest_window=float(environ.get("AI_DIGEST_WINDOW", cls.digest_window)),
+        )
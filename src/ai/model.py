@@ -0,0 +1,138 @@
+from __future__ import annotations
+from threading import Lock
+from time import perf_counter, time
+from os import stat, sysconf
+from logging import getLogger
+from typing import Any, Optional, Sequence
+from fasttext import load_model  # type: ignore
+
+
+logger = getLogger(__name__)
+
+
+def current_rss() -> int:
+    """returns the resident set size of this process in bytes.
+
+    reads /proc when available and falls back to the peak rss reported by the resource module.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def score_prediction(labels: Sequence[str], probabilities: Sequence[float]) -> dict[str, float]:
+    """turns a raw fastText prediction into a label -> probability dict, with the `__label__` prefix stripped."""
+    return {
+        label.replace("__label__", ""): float(probability)
+        for label, probability in zip(labels, probabilities)
+    }
+
+
+def is_toxic(score: dict[str, float]) -> bool:
+    """the flagging rule used by AI moderation."""
+    return score.get("non_toxic", 0) < 0.5
+
+
+class ModelRegistry:
+    """keeps a single fastText model resident in memory and allows it to be swapped out at runtime.
+
+    predictions grab a reference to the current model before running, so a reload never
+    interrupts predictions that are already in flight; they simply finish on the old model.
+    """
+
+    __slots__ = (
+        "path",
+        "_model",
+        "_lock",
+        "loaded_at",
+        "load_time",
+        "memory",
+        "mtime",
+        "generation",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._model: Any = None
+        self._lock = Lock()
+        self.loaded_at: Optional[float] = None
+        self.load_time: float = 0.0
+        self.memory: int = 0
+        self.mtime: Optional[float] = None
+        self.generation: int = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            raise RuntimeError("model has not been loaded yet.")
+        return self._model
+
+    def load(self, path: Optional[str] = None) -> None:
+        """(re)loads the model from disk and swaps it in. blocking, so run it in an executor from async code.
+
+        Args:
+            path (str, optional): a new path to load the model from. Defaults to the current path.
+        """
+        path = path or self.path
+        # only one load at a time, otherwise two reloads would double the memory spike
+        with self._lock:
+            rss_before = current_rss()
+            started = perf_counter()
+            model = load_model(path)
+            load_time = perf_counter() - started
+            memory = max(current_rss() - rss_before, 0)
+
+            # a single reference assignment, so readers see either the old or the new model
+            self._model = model
+            self.path = path
+            self.load_time = load_time
+            self.memory = memory
+            self.loaded_at = time()
+            self.mtime = stat(path).st_mtime
+            self.generation += 1
+
+        logger.info(
+            f"loaded model {path} (generation {self.generation}) in {load_time:.2f}s, "
+            f"~{memory / 1024 / 1024:.1f} MiB resident"
+        )
+
+    def changed_on_disk(self) -> bool:
+        """whether the model file has been modified since it was last loaded."""
+        try:
+            return self.mtime is not None and stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return False
+
+    def predict(self, content: str, k: int = 6) -> dict[str, float]:
+        """scores a single piece of text with the resident model."""
+        # fastText only predicts one line at a time
+        labels, probabilities = self.model.predict(content.replace("\n", " "), k=k)
+        return score_prediction(labels, probabilities)
+
+    def predict_batch(self, contents: list[str], k: int = 6) -> list[dict[str, float]]:
+        """scores many texts in a single call to the resident model."""
+        labels, probabilities = self.model.predict(
+            [content.replace("\n", " ") for content in contents], k=k
+        )
+        return [score_prediction(*prediction) for prediction in zip(labels, probabilities)]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+            "load_time": self.load_time,
+            "memory": self.memory,
+            "rss": current_rss(),
+        }
+
+    def __repr__(self):
+        return f"<ModelRegistry(path={self.path}, generation={self.generation})>"
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from asyncio import Queue, Task, create_task
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from src.metrics import LatencyTracker
+
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Stage(Generic[T]):
+    """one step of a pipeline: a bounded input queue drained by a fixed number of workers.
+
+    the handler returns the item to pass it on to the next stage, or None to stop it here.
+    when the next stage's queue is full, workers wait, so a slow stage pushes back on the
+    ones before it instead of letting work pile up in memory. the queue only holds as many
+    items as the stage has workers unless told otherwise, so it hands work over rather than
+    buffering it. buffering (and deciding what to drop) is left to whatever feeds the pipeline.
+    """
+
+    __slots__ = (
+        "name",
+        "handler",
+        "concurrency",
+        "queue",
+        "next",
+        "latency",
+        "processed",
+        "passed",
+        "errors",
+        "_workers",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[T], Awaitable[Optional[T]]],
+        concurrency: int = 1,
+        max_queue: Optional[int] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(concurrency, 1)
+        self.queue: Queue[T] = Queue(maxsize=max_queue or self.concurrency)
+        self.next: Optional[Stage[T]] = None
+        self.latency = LatencyTracker()
+        self.processed: int = 0
+        self.passed: int = 0
+        self.errors: int = 0
+        self._workers: list[Task[None]] = []
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def _work(self) -> None:
+        while True:
+            item = await self.queue.get()
+            started = perf_counter()
+            try:
+                result = await self.handler(item)
+            except Exception as e:  # one bad item shouldn't take the stage down
+                self.errors += 1
+                logger.error(f"error in {self.name} stage: {e}")
+                result = None
+            finally:
+                self.latency.record(perf_counter() - started)
+                self.processed += 1
+                self.queue.task_done()
+            if result is not None and self.next:
+                self.passed += 1
+                await self.next.queue.put(result)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.queue.maxsize,
+            "processed": self.processed,
+            "passed": self.passed,
+            "errors": self.errors,
+            **self.latency.summary(),
+        }
+
+    def __repr__(self):
+        return f"<Stage(name={self.name}, concurrency={self.concurrency}, depth={self.queue.qsize()})>"
+
+
+class Pipeline(Generic[T]):
+    """a chain of stages, each feeding the next."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self, *stages: Stage[T]):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+
+    async def submit(self, item: T) -> None:
+        """feeds an item into the first stage, waiting for room if it is full."""
+        for stage in self.stages:
+            stage.start()
+        await self.stages[0].queue.put(item)
+
+    def close(self) -> None:
+        for stage in self.stages:
+            stage.close()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def __repr__(self):
+        return f"<Pipeline({' -> '.join(stage.name for stage in self.stages)})>"
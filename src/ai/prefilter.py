@@ -0,0 +1,141 @@
+from __future__ import annotations
+from collections import Counter
+from enum import Enum
+from re import compile
+from typing import Any, Iterable, Optional
+
+from src.ai.cache import normalize_content
+
+
+URLS = compile(r"https?://\S+")
+CUSTOM_EMOJIS = compile(r"<a?:\w+:\d+>")
+# emoji, symbols, punctuation and anything else that carries no words for the model
+NON_WORDS = compile(r"[^\w]+")
+
+
+class Decision(Enum):
+    SKIP = "skip"
+    SCAN = "scan"
+    FLAG = "flag"
+
+
+class KeywordTrie:
+    """a character trie of keywords that must always be flagged, matched on word boundaries."""
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        self._root: dict[str, Any] = {}
+        self.size: int = 0
+        for keyword in keywords:
+            self.add(keyword)
+
+    def add(self, keyword: str) -> None:
+        keyword = normalize_content(keyword)
+        if not keyword:
+            return
+        node = self._root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        if "" not in node:
+            self.size += 1
+        # the empty key marks the end of a keyword and stores it
+        node[""] = keyword
+
+    def search(self, content: str) -> Optional[str]:
+        """returns the first keyword found in already normalized content, or None."""
+        if not self._root:
+            return None
+        length = len(content)
+        for start in range(length):
+            if start and content[start - 1].isalnum():
+                continue
+            node = self._root
+            for position in range(start, length + 1):
+                if "" in node and (position == length or not content[position].isalnum()):
+                    return node[""]
+                if position == length or (node := node.get(content[position])) is None:
+                    break
+        return None
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_file(cls, path: str) -> KeywordTrie:
+        """loads one keyword per line, ignoring blank lines and lines starting with `#`."""
+        with open(path, encoding="utf-8") as f:
+            return cls(
+                line.strip() for line in f if line.strip() and not line.startswith("#")
+            )
+
+
+class PreFilter:
+    """decides whether a message needs the model at all, before any inference happens.
+
+    rules run in order and the first one that applies wins. `counts` records how often
+    each rule decided a message, so the model calls saved can be measured.
+    """
+
+    __slots__ = ("min_length", "keywords", "counts")
+
+    def __init__(self, min_length: int = 3, keywords: Optional[KeywordTrie] = None):
+        self.min_length = min_length
+        self.keywords = keywords or KeywordTrie()
+        self.counts: Counter[str] = Counter()
+
+    def _decide(
+        self,
+        content: str,
+        channel_id: int,
+        role_ids: Iterable[int],
+        ignored_channels: Iterable[int],
+        ignored_roles: Iterable[int],
+    ) -> tuple[Decision, str]:
+        if channel_id in ignored_channels:
+            return Decision.SKIP, "ignored_channel"
+        if not set(ignored_roles).isdisjoint(role_ids):
+            return Decision.SKIP, "ignored_role"
+
+        normalized = normalize_content(content)
+        if self.keywords.search(normalized):
+            return Decision.FLAG, "keyword"
+
+        words = NON_WORDS.sub("", CUSTOM_EMOJIS.sub("", URLS.sub("", normalized)))
+        if not words:
+            return Decision.SKIP, "no_text"
+        if len(words) < self.min_length:
+            return Decision.SKIP, "too_short"
+        return Decision.SCAN, "scan"
+
+    def decide(
+        self,
+        content: str,
+        channel_id: int,
+        role_ids: Iterable[int] = (),
+        ignored_channels: Iterable[int] = (),
+        ignored_roles: Iterable[int] = (),
+    ) -> tuple[Decision, str]:
+        """classifies a message as skip, scan or flag.
+
+        Args:
+            content (str): the message content.
+            channel_id (int): the channel the message was sent in.
+            role_ids (Iterable[int], optional): the roles of the author.
+            ignored_channels (Iterable[int], optional): channels the guild excluded from AI moderation.
+            ignored_roles (Iterable[int], optional): roles the guild excluded from AI moderation.
+
+        Returns:
+            tuple[Decision, str]: the decision and the name of the rule that made it.
+        """
+        decision, rule = self._decide(
+            content, channel_id, role_ids, ignored_channels, ignored_roles
+        )
+        self.counts[rule] += 1
+        return decision, rule
+
+    def stats(self) -> dict[str, int]:
+        return dict(self.counts)
+
+    def __repr__(self):
+        return f"<PreFilter(min_length={self.min_length}, keywords={len(self.keywords)})>"
@@ -0,0 +1,81 @@
+"""quantizes the AI moderation model into a much smaller `.ftz` model and compares the two.
+
+    python -m src.ai.quantize --output src/cogs/model.ftz --corpus corpus.jsonl
+
+prints the file size, load time and memory of both models (each loaded in a fresh process, so
+the numbers don't depend on what this one already freed or kept) and, when a labeled corpus is
+given, the change in precision/recall under the same scoring rules the bot uses. point
+`AI_MODEL_PATH` at the `.ftz` file to run the bot on it.
+"""
+from __future__ import annotations
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os.path import getsize
+from typing import Optional
+
+from src.ai.bench import run
+from src.ai.config import AiConfig
+from src.ai.model import ModelRegistry
+
+
+def measure(path: str) -> tuple[float, int]:
+    """loads a model and returns its load time and resident memory. meant to run in its own process."""
+    registry = ModelRegistry(path)
+    registry.load()
+    return registry.load_time, registry.memory
+
+
+def describe(name: str, path: str) -> None:
+    # a freed model isn't reliably given back to the OS, so measuring in this process after
+    # loading another model would be off. spawn starts from an empty interpreter every time
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        load_time, memory = executor.submit(measure, path).result()
+    print(
+        f"{name:>10}: {getsize(path) / 1024 / 1024:>8.1f} MiB on disk, "
+        f"loaded in {load_time:.2f}s, ~{memory / 1024 / 1024:.1f} MiB resident"
+    )
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m src.ai.quantize", description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=AiConfig.from_env().model_path, help="model to quantize")
+    parser.add_argument("--output", required=True, help="where to write the .ftz model")
+    parser.add_argument("--corpus", help="labeled JSONL or CSV corpus to compare accuracy on")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N messages")
+    parser.add_argument(
+        "--cutoff", type=int, default=0, help="keep only the N most important words and ngrams, 0 keeps all"
+    )
+    parser.add_argument("--dsub", type=int, default=2, help="size of each product quantization sub-vector")
+    parser.add_argument("--qnorm", action="store_true", help="quantize the vector norms separately")
+    options = parser.parse_args(args)
+
+    describe("original", options.model)
+    original = ModelRegistry(options.model)
+    original.load()
+    before = run(original, options.corpus, 64, options.limit)[1].report() if options.corpus else {}
+
+    # retraining after a cutoff would need the original training data, which isn't shipped with the bot
+    original.model.quantize(cutoff=options.cutoff, dsub=options.dsub, qnorm=options.qnorm)
+    original.model.save_model(options.output)
+    del original
+
+    describe("quantized", options.output)
+
+    if not options.corpus:
+        return
+    quantized = ModelRegistry(options.output)
+    quantized.load()
+    after = run(quantized, options.corpus, 64, options.limit)[1].report()
+    print(f"\n{'label':>16} {'precision':>18} {'recall':>18}")
+    for label in sorted(set(before) | set(after)):
+        old = before.get(label, {"precision": 0.0, "recall": 0.0})
+        new = after.get(label, {"precision": 0.0, "recall": 0.0})
+        print(
+            f"{label:>16} {new['precision']:>8.3f} ({new['precision'] - old['precision']:+.3f}) "
+            f"{new['recall']:>8.3f} ({new['recall'] - old['recall']:+.3f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
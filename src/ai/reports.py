@@ -0,0 +1,163 @@
+from __future__ import annotations
+from asyncio import Event, Task, create_task, get_running_loop, sleep, wait_for, TimeoutError
+from collections import deque
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Channel(Generic[T]):
+    __slots__ = ("queue", "ready", "task", "sent")
+
+    def __init__(self):
+        # (item, digest) pairs waiting to be sent
+        self.queue: deque[tuple[T, bool]] = deque()
+        self.ready = Event()
+        self.task: Task[None] | None = None
+        # send times inside the current rate limit window
+        self.sent: deque[float] = deque()
+
+
+class ReportSender(Generic[T]):
+    """sends reports one channel at a time, optionally folding them into digests.
+
+    every channel has a single sender task, so reports for one channel never race each other
+    and are paced to stay under the channel's rate limit (`rate` messages per `per` seconds)
+    instead of running into 429s. reports submitted with `digest=True` are held for up to
+    `window` seconds and sent together, up to `max_batch` per message.
+    """
+
+    __slots__ = (
+        "flush",
+        "window",
+        "max_batch",
+        "max_queue",
+        "rate",
+        "per",
+        "_channels",
+        "messages",
+        "reports",
+        "dropped",
+    )
+
+    def __init__(
+        self,
+        flush: Callable[[int, list[T]], Awaitable[Any]],
+        window: float = 10.0,
+        max_batch: int = 10,
+        max_queue: int = 100,
+        rate: int = 5,
+        per: float = 5.0,
+    ):
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.rate = rate
+        self.per = per
+        self._channels: dict[int, _Channel[T]] = {}
+        self.messages: int = 0
+        self.reports: int = 0
+        self.dropped: int = 0
+
+    def submit(self, channel_id: int, item: T, digest: bool = False) -> None:
+        """queues a report for a channel.
+
+        Args:
+            channel_id (int): the channel to send the report to.
+            item (T): the report, passed on to `flush`.
+            digest (bool, optional): whether the report may wait to be sent with others. Defaults to False.
+        """
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _Channel()
+        if len(channel.queue) >= self.max_queue:
+            # moderators can't act on a backlog that large anyway, keep the newest
+            channel.queue.popleft()
+            self.dropped += 1
+        channel.queue.append((item, digest))
+        channel.ready.set()
+        if channel.task is None or channel.task.done():
+            channel.task = create_task(self._run(channel_id, channel))
+
+    async def _throttle(self, channel: _Channel[T]) -> None:
+        loop = get_running_loop()
+        while channel.sent and loop.time() - channel.sent[0] >= self.per:
+            channel.sent.popleft()
+        if len(channel.sent) >= self.rate:
+            await sleep(self.per - (loop.time() - channel.sent[0]))
+            channel.sent.popleft()
+        channel.sent.append(loop.time())
+
+    async def _take(self, channel: _Channel[T]) -> list[T]:
+        item, digest = channel.queue.popleft()
+        batch = [item]
+        if not digest:
+            return batch
+
+        deadline = get_running_loop().time() + self.window
+        while len(batch) < self.max_batch:
+            if channel.queue and channel.queue[0][1]:
+                batch.append(channel.queue.popleft()[0])
+                continue
+            if channel.queue:
+                # a report that can't wait is next in line, send what we have
+                break
+            remaining = deadline - get_running_loop().time()
+            if remaining <= 0:
+                break
+            channel.ready.clear()
+            try:
+                await wait_for(channel.ready.wait(), remaining)
+            except TimeoutError:
+                break
+        return batch
+
+    async def _run(self, channel_id: int, channel: _Channel[T]) -> None:
+        loop = get_running_loop()
+        while True:
+            while channel.queue:
+                batch = await self._take(channel)
+                await self._throttle(channel)
+                try:
+                    await self.flush(channel_id, batch)
+                except Exception as e:
+                    logger.error(f"failed to send {len(batch)} reports to {channel_id}: {e}")
+                    continue
+                self.messages += 1
+                self.reports += len(batch)
+            # the send times count for one more window. stay around until then, otherwise the
+            # next report would start a fresh channel with no history and skip the rate limit
+            remaining = channel.sent[-1] + self.per - loop.time() if channel.sent else 0
+            if remaining <= 0:
+                break
+            channel.ready.clear()
+            try:
+                await wait_for(channel.ready.wait(), remaining)
+            except TimeoutError:
+                break
+        # nothing left, let the channel be cleaned up
+        if self._channels.get(channel_id) is channel and not channel.queue:
+            del self._channels[channel_id]
+
+    def close(self) -> None:
+        for channel in self._channels.values():
+            if channel.task:
+                channel.task.cancel()
+        self._channels.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "channels": len(self._channels),
+            "queued": sum(len(channel.queue) for channel in self._channels.values()),
+            "messages": self.messages,
+            "reports": self.reports,
+            "dropped": self.dropped,
+        }
+
+    def __repr__(self):
+        return f"<ReportSender(window={self.window}, channels={len(self._channels)})>"
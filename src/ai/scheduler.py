@@ -0,0 +1,159 @@
+from __future__ import annotations
+from asyncio import Event, Task, create_task
+from collections import OrderedDict, deque
+from logging import getLogger
+from typing import Any, Awaitable, Callable
+
+
+logger = getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+OVERLOAD_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class ScanScheduler:
+    """runs scan jobs with bounded concurrency, taking turns between guilds.
+
+    every guild gets its own queue and workers serve guilds round-robin, so a guild that is
+    being raided only ever delays its own scans. when a guild's queue or the whole scheduler
+    is full, the overload policy decides what gets dropped:
+
+    - `drop_oldest` drops the oldest waiting scan of the guild with the longest queue.
+    - `drop_newest` refuses the scan that was just submitted.
+    """
+
+    __slots__ = (
+        "concurrency",
+        "max_per_guild",
+        "max_pending",
+        "policy",
+        "_queues",
+        "_pending",
+        "_running",
+        "_ready",
+        "_workers",
+        "processed",
+        "deferred",
+        "dropped",
+        "failed",
+    )
+
+    def __init__(
+        self,
+        concurrency: int = 64,
+        max_per_guild: int = 100,
+        max_pending: int = 5000,
+        policy: str = "drop_oldest",
+    ):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(OVERLOAD_POLICIES)}.")
+        self.concurrency = max(concurrency, 1)
+        self.max_per_guild = max(max_per_guild, 1)
+        self.max_pending = max(max_pending, 1)
+        self.policy = policy
+        # guilds with waiting jobs, in the order they will be served
+        self._queues: OrderedDict[int, deque[Job]] = OrderedDict()
+        self._pending: int = 0
+        self._running: int = 0
+        self._ready = Event()
+        self._workers: list[Task[None]] = []
+        self.processed: int = 0
+        self.deferred: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _drop_oldest(self, guild_id: int) -> None:
+        queue = self._queues[guild_id]
+        queue.popleft()
+        self._pending -= 1
+        self.dropped += 1
+        if not queue:
+            del self._queues[guild_id]
+
+    def submit(self, guild_id: int, job: Job) -> bool:
+        """queues a job for a guild.
+
+        Args:
+            guild_id (int): the guild the job belongs to.
+            job (Job): a coroutine function that runs the scan.
+
+        Returns:
+            bool: whether the job was queued. False if the overload policy refused it.
+        """
+        if not self._workers:
+            self._workers = [create_task(self._work()) for _ in range(self.concurrency)]
+
+        queue = self._queues.get(guild_id)
+        guild_full = queue is not None and len(queue) >= self.max_per_guild
+        if guild_full or self._pending >= self.max_pending:
+            if self.policy == "drop_newest":
+                self.dropped += 1
+                return False
+            # make room at the expense of whoever is flooding the most
+            self._drop_oldest(
+                guild_id
+                if guild_full
+                else max(self._queues, key=lambda guild: len(self._queues[guild]))
+            )
+            queue = self._queues.get(guild_id)
+
+        if queue is None:
+            queue = self._queues[guild_id] = deque()
+        queue.append(job)
+        self._pending += 1
+        if self._running + self._pending > self.concurrency:
+            # every worker is busy, so this job has to wait its turn
+            self.deferred += 1
+        self._ready.set()
+        return True
+
+    def _next(self) -> Job:
+        guild_id, queue = self._queues.popitem(last=False)
+        job = queue.popleft()
+        self._pending -= 1
+        if queue:
+            # back of the line until every other guild had a turn
+            self._queues[guild_id] = queue
+        elif not self._queues:
+            self._ready.clear()
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            await self._ready.wait()
+            if not self._queues:
+                continue
+            job = self._next()
+            self._running += 1
+            try:
+                await job()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"scan job failed: {e}")
+            finally:
+                self._running -= 1
+            self.processed += 1
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "running": self._running,
+            "guilds": len(self._queues),
+            "processed": self.processed,
+            "deferred": self.deferred,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def __repr__(self):
+        return f"<ScanScheduler(concurrency={self.concurrency}, policy={self.policy}, pending={self._pending})>"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+from asyncio import get_running_loop
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from logging import getLogger
+from typing import Any, Optional
+
+from src.ai.model import ModelRegistry
+
+
+logger = getLogger(__name__)
+
+# set in the parent right before the workers are forked, so every worker inherits the
+# already loaded model. the model's weights are never written to, so the pages stay
+# shared copy-on-write between the bot and all of its workers.
+_registry: Optional[ModelRegistry] = None
+
+
+def _predict_batch(contents: list[str], k: int) -> list[dict[str, float]]:
+    if _registry is None:
+        raise RuntimeError("worker was started without a model.")
+    return _registry.predict_batch(contents, k)
+
+
+class ProcessInferencePool:
+    """runs predictions in a pool of worker processes so classification can use more than one core.
+
+    workers are forked from the bot after the model is loaded instead of loading their own copy.
+    if a worker dies, the pool is rebuilt and the batch is retried once.
+    """
+
+    __slots__ = ("registry", "workers", "_executor", "restarts")
+
+    def __init__(self, registry: ModelRegistry, workers: int):
+        self.registry = registry
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.restarts: int = 0
+
+    def start(self) -> None:
+        """(re)creates the worker processes from the currently loaded model.
+
+        workers from the previous pool finish whatever they are running before they exit.
+        """
+        global _registry
+        _registry = self.registry
+        old, self._executor = self._executor, ProcessPoolExecutor(
+            max_workers=self.workers,
+            # main.py starts the bot at import time, so spawned workers would log in a second bot
+            mp_context=get_context("fork"),
+        )
+        if old:
+            old.shutdown(wait=False)
+
+    async def predict_batch(self, contents: list[str], k: int = 6) -> list[dict[str, float]]:
+        if self._executor is None:
+            self.start()
+        loop = get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, _predict_batch, contents, k)
+        except BrokenProcessPool:
+            logger.warning("an inference worker died, restarting the pool")
+            self.restarts += 1
+            self.start()
+            return await loop.run_in_executor(self._executor, _predict_batch, contents, k)
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {"workers": self.workers, "restarts": self.restarts}
+
+    def __repr__(self):
+        return f"<ProcessInferencePool(workers={self.workers}, restarts={self.restarts})>"
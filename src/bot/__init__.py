@@ -1,14 +1,24 @@
 import logging
 import coloredlogs
-from asyncio import sleep
+from asyncio import Event, sleep
 from typing import Optional, List, Tuple
 
-from asyncpg import create_pool, Pool
+from asyncpg import connect, create_pool, Pool
+from cachetools import TTLCache
 from discord import Intents, Game, MemberCacheFlags, HTTPException, Thread
 from discord.abc import GuildChannel, PrivateChannel
 from discord.ext.commands import when_mentioned, Bot
 
-from src.db import Database
+from src.db import (
+    BACKENDS,
+    Database,
+    DatabaseConfig,
+    DatabaseUnavailable,
+    MemoryBackend,
+    PostgresBackend,
+)
+from src.db.migrations import migrate
+from src.db.queries import GlyphConnection, prepare_replica_statements, prepare_statements
 
 # omg colors
 coloredlogs.install(
@@ -36,20 +46,43 @@ class Glyph(Bot):
         "reaction_roles",
         "pool",
         "database_url",
+        "replica_url",
+        "replica_pool",
         "db",
+        "db_config",
         "scanned_messages_count",
+        "fetched_channels",
+        "db_ready",
+        "settings_prewarmed",
     )
 
-    def __init__(self, database_url: Optional[str] = None, test_mode: Optional[bool] = False):
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        test_mode: Optional[bool] = False,
+        replica_url: Optional[str] = None,
+    ):
         intents = Intents.none()
         intents.guilds = True
         intents.message_content = True
         intents.guild_messages = True
 
         self.db: Database
+        self.db_config = DatabaseConfig.from_env()
+        if self.db_config.backend not in BACKENDS:
+            raise ValueError(f"DB_BACKEND must be one of {', '.join(BACKENDS)}.")
         self.reaction_roles: List[Tuple[int, int, int]] = []
         self.database_url = database_url
+        # optional read replica, reads that tolerate a little lag are sent there
+        self.replica_url = replica_url
+        self.replica_pool: Optional[Pool] = None
         self.scanned_messages_count: int = 0
+        self.db_ready = Event()
+        self.settings_prewarmed = False
+        # channels we had to fetch are kept around briefly
+        self.fetched_channels: TTLCache[int, GuildChannel | PrivateChannel | Thread] = TTLCache(
+            maxsize=1000, ttl=300
+        )
 
         member_cache_flags = MemberCacheFlags.none()
 
@@ -64,7 +97,7 @@ class Glyph(Bot):
 
         logger.info("Bot initialized")
 
-        self.load_all_cogs(["fun", "moderation", "utils", "ai", "config", "error"])
+        self.load_all_cogs(["fun", "moderation", "utils", "ai", "config", "error", "leveling"])
 
     def load_all_cogs(self, cogs: List[str]):
         """Load all specified cogs."""
@@ -84,57 +117,120 @@ class Glyph(Bot):
 
         await self.change_presence(activity=Game("/info"))
 
+        # on_ready also fires after reconnects, the cache only needs warming once
+        if not self.settings_prewarmed:
+            self.settings_prewarmed = True
+            await self.db_ready.wait()
+            try:
+                loaded, inserted, seconds = await self.db.prewarm_guild_settings(
+                    [guild.id for guild in self.guilds]
+                )
+            except DatabaseUnavailable as e:
+                # settings are loaded one guild at a time instead, once the database is back
+                logger.warning(f"Skipped warming the settings cache: {e}")
+                return
+            logger.info(
+                f"Warmed settings cache in {seconds:.2f}s: {loaded} loaded, {inserted} defaults created"
+            )
+
+    async def close(self):
+        """Flush buffered database writes before shutting down."""
+        if db := getattr(self, "db", None):
+            try:
+                await db.close()
+            except Exception as e:
+                logger.error(f"Failed to flush database writes: {e}")
+        await super().close()
+
     async def getch_channel(self, channel_id: int) -> Optional[GuildChannel | PrivateChannel | Thread]:
         """Fetch a channel from cache or API."""
-        if channel := self.get_channel(channel_id):
+        if channel := self.get_channel(channel_id) or self.fetched_channels.get(channel_id):
             return channel
         try:
-            return await self.fetch_channel(channel_id)
+            channel = self.fetched_channels[channel_id] = await self.fetch_channel(channel_id)
+            return channel
         except HTTPException:
             return None
 
     async def init_db(self):
         """Initialize the database."""
+        if self.db_config.backend == "memory":
+            # nothing to connect to, everything lives in this process and is gone on exit
+            logger.warning("Using the in-memory database, no data will be saved")
+            self.db = Database(MemoryBackend(), self.db_config)
+            self.db_ready.set()
+            return
+
         retry = 1
         max_retries = 3
+        degraded = False
 
         while retry <= max_retries:
             try:
-                self.pool: Pool = await create_pool(self.database_url)
+                await self.migrate_db()
+                self.pool: Pool = await create_pool(
+                    self.database_url,
+                    connection_class=GlyphConnection,
+                    init=prepare_statements,
+                )
                 break
             except Exception as e:
                 if retry >= max_retries:
-                    logger.error(f"Database connection error: {e}. Exiting.")
-                    await self.wait_until_ready()
-                    await self.close()
-                    raise e
+                    logger.error(
+                        f"Database connection error: {e}. Starting in degraded mode, "
+                        + "the database will be retried in the background."
+                    )
+                    # with min_size=0 the pool only connects once something needs a connection
+                    self.pool = await create_pool(
+                        self.database_url,
+                        min_size=0,
+                        connection_class=GlyphConnection,
+                        init=prepare_statements,
+                    )
+                    degraded = True
+                    break
                 retry += 1
                 logger.error(f"Database connection error: {e}. Retrying in 3 seconds.")
                 await sleep(3)
 
-        async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS warns(
-                        user_id BIGINT, 
-                        reason TEXT, 
-                        time BIGINT, 
-                        guild BIGINT
-                    )
-                """)
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS leveling(
-                        user_id BIGINT, 
-                        xp BIGINT
-                    )
-                """)
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS guild_config (
-                        guild_id BIGINT PRIMARY KEY, 
-                        ai_reports_channel BIGINT UNIQUE, 
-                        logs_channel BIGINT UNIQUE, 
-                        leveling_enabled BOOLEAN DEFAULT FALSE
-                    )
-                """)
+        if self.replica_url:
+            try:
+                self.replica_pool = await create_pool(
+                    self.replica_url,
+                    connection_class=GlyphConnection,
+                    init=prepare_replica_statements,
+                )
+                logger.info("Read replica connected")
+            except Exception as e:
+                # the replica is an optimization, everything still works on the primary alone
+                logger.error(f"Read replica connection error: {e}. Using the primary only.")
+
         logger.info("Database initialized")
-        self.db = Database(self.pool)
+        self.db = Database(
+            PostgresBackend(self.pool, self.replica_pool),
+            self.db_config,
+            # the pool prepares its statements against the final schema, so it can't be used
+            # before the migrations ran. probe with a connection of its own instead
+            health_check=self.ping_db if degraded else None,
+            on_recover=self.migrate_db if degraded else None,
+        )
+        if degraded:
+            self.db.trip()
+        self.db_ready.set()
+
+    async def ping_db(self):
+        """Check that the database answers, without going through the pool."""
+        conn = await connect(self.database_url)
+        try:
+            await conn.fetchval("SELECT 1")
+        finally:
+            await conn.close()
+
+    async def migrate_db(self):
+        """Bring the database schema up to date."""
+        # migrate first, the pool prepares its statements against the final schema
+        conn = await connect(self.database_url)
+        try:
+            await migrate(conn)
+        finally:
+            await conn.close()
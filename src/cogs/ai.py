@@ -1,15 +1,39 @@
 from __future__ import annotations
 from src.bot import Glyph
-from discord.ext.commands import Cog
+from src.db import GuildSettings
+from src.metrics import LatencyTracker
+from src.ai import (
+    AiConfig,
+    Decision,
+    InferenceBatcher,
+    KeywordTrie,
+    ModelRegistry,
+    Pipeline,
+    PreFilter,
+    ProcessInferencePool,
+    ReportSender,
+    ScanScheduler,
+    Stage,
+    VerdictCache,
+    content_key,
+    is_toxic,
+)
+from discord.ext.commands import Cog, Context, group, is_owner
+from discord.ext.tasks import loop
 from discord.channel import TextChannel
-from discord import Message, Embed, ButtonStyle, Interaction
-from discord.ui import View, Button
-from typing import Optional
+from discord import Message, Embed, ButtonStyle, Interaction, SelectOption, Guild, Object
+from discord.errors import NotFound
+from discord.utils import utcnow
+from discord.ui import View, Button, Select
+from typing import Any, Awaitable, Optional
 from datetime import timedelta
 from logging import getLogger
 from dataclasses import dataclass
-from fasttext import load_model # type: ignore
-from asyncio import get_running_loop
+from functools import partial
+from asyncio import Future, gather, get_running_loop
+from cachetools import TTLCache
+from humanize import naturalsize
+from time import perf_counter
 
 
 logger = getLogger(__name__)
@@ -53,11 +77,260 @@ class AiPartialMessage:
         )
 
 
+@dataclass
+class ScanContext:
+    """a message on its way through the moderation pipeline, filled in stage by stage."""
+
+    message: Message
+    settings: Optional[GuildSettings] = None
+    # hash of the normalized content, set once the verdict cache has been checked
+    key: Optional[bytes] = None
+    score: Optional[dict[str, float]] = None
+
+
 class AiModeration(Cog):
-    __slots__ = ["bot"]
+    __slots__ = [
+        "bot",
+        "config",
+        "model",
+        "workers",
+        "batcher",
+        "verdicts",
+        "pending",
+        "prefilter",
+        "scheduler",
+        "report_latency",
+        "reports",
+        "pipeline",
+        "handled",
+    ]
 
     def __init__(self, bot: Glyph):
         self.bot = bot
+        self.config = AiConfig.from_env()
+        # load the model once up front; every scan shares this copy
+        self.model = ModelRegistry(self.config.model_path)
+        self.model.load()
+        self.workers: Optional[ProcessInferencePool] = None
+        if self.config.workers > 0:
+            self.workers = ProcessInferencePool(self.model, self.config.workers)
+        if self.config.model_watch_interval > 0:
+            self.watch_model.change_interval(seconds=self.config.model_watch_interval)
+            self.watch_model.start()
+        # messages from every guild are pooled into shared model calls
+        self.batcher = InferenceBatcher(
+            self.predict_batch,
+            max_batch_size=self.config.batch_size,
+            max_delay=self.config.batch_delay / 1000,
+            max_queue=self.config.batch_queue_size,
+            concurrency=self.config.workers or 1,
+        )
+        self.verdicts: Optional[VerdictCache] = None
+        if self.config.cache_size > 0:
+            self.verdicts = VerdictCache(
+                max_memory=int(self.config.cache_size * 1024 * 1024),
+                ttl=self.config.cache_ttl,
+            )
+        # identical messages that are being scored right now share a single prediction
+        self.pending: dict[bytes, Future[dict[str, float]]] = {}
+        self.prefilter = PreFilter(
+            min_length=self.config.min_length,
+            keywords=KeywordTrie.from_file(self.config.keywords_file)
+            if self.config.keywords_file
+            else None,
+        )
+        # the per-guild queues are the only deep buffer. the stage queues are only as deep as
+        # each stage is wide, so once the pipeline is full the scheduler's workers wait and
+        # messages keep waiting (or get dropped) in their guild's queue, in round-robin order
+        self.scheduler = ScanScheduler(
+            concurrency=self.config.scan_concurrency,
+            max_per_guild=self.config.scan_guild_queue_size,
+            max_pending=self.config.scan_queue_size,
+            policy=self.config.overload_policy,
+        )
+        # time from a message being flagged to its report being sent
+        self.report_latency = LatencyTracker()
+        self.reports: ReportSender[tuple[AiPartialMessage, Embed, float]] = ReportSender(
+            self.send_reports, window=self.config.digest_window
+        )
+        # (message id, action) pairs acted on recently, to drop repeated clicks
+        self.handled: TTLCache[tuple[int, str], bool] = TTLCache(maxsize=10_000, ttl=60)
+        self.pipeline: Pipeline[ScanContext] = Pipeline(
+            Stage("gate", self.gate, self.config.gate_concurrency),
+            Stage("normalize", self.normalize),
+            Stage("infer", self.infer, self.config.scan_concurrency),
+            Stage("decide", self.decide),
+            Stage("report", self.report),
+        )
+
+    def cog_unload(self):
+        self.watch_model.cancel()
+        self.scheduler.close()
+        self.pipeline.close()
+        self.reports.close()
+        self.batcher.close()
+        if self.workers:
+            self.workers.close()
+
+    async def predict_batch(self, contents: list[str]) -> list[dict[str, float]]:
+        if self.workers:
+            return await self.workers.predict_batch(contents, 6)
+        return await get_running_loop().run_in_executor(
+            None, self.model.predict_batch, contents, 6
+        )
+
+    async def classify(self, content: str, key: Optional[bytes] = None) -> dict[str, float]:
+        """scores a message, answering from the verdict cache when the same content was seen recently.
+
+        Args:
+            content (str): the message content to score.
+            key (bytes, optional): the content key, if the verdict cache was already checked for it.
+
+        Returns:
+            dict[str, float]: label -> probability, highest first.
+        """
+        if not self.verdicts:
+            return await self.batcher.submit(content)
+
+        if key is None:
+            key = content_key(content)
+            if (score := self.verdicts.get(key)) is not None:
+                return score
+        if key in self.pending:
+            return await self.pending[key]
+
+        future: Future[dict[str, float]] = get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            score = await self.batcher.submit(content)
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting, don't warn about an unretrieved exception
+            future.exception()
+            raise
+        else:
+            self.verdicts.put(key, score)
+            future.set_result(score)
+            return score
+        finally:
+            del self.pending[key]
+
+    async def reload_model(self, path: Optional[str] = None) -> None:
+        """loads the model again off the event loop and swaps it in once it's ready.
+
+        Args:
+            path (str, optional): a different model file to switch to. Defaults to the current path.
+        """
+        await get_running_loop().run_in_executor(None, self.model.load, path)
+        if self.workers:
+            # fork a fresh set of workers that share the new model
+            self.workers.start()
+        if self.verdicts:
+            # cached verdicts came from the old model
+            self.verdicts.clear()
+
+    @loop(seconds=60)
+    async def watch_model(self):
+        # hot-swap the model whenever the file on disk is replaced
+        if self.model.changed_on_disk():
+            logger.info(f"{self.model.path} changed on disk, reloading")
+            try:
+                await self.reload_model()
+            except Exception as e:
+                logger.error(f"failed to reload model: {e}")
+
+    @group(name="ai", invoke_without_command=True, hidden=True)
+    @is_owner()
+    async def ai_admin(self, ctx: Context):
+        await ctx.reply("Subcommands: `reload [path]`, `stats`")
+
+    @ai_admin.command(name="reload")
+    @is_owner()
+    async def ai_reload(self, ctx: Context, path: Optional[str] = None):
+        """reloads the moderation model without dropping in-flight scans."""
+        try:
+            await self.reload_model(path)
+        except Exception as e:
+            await ctx.reply(f"Failed to reload model: `{e}`")
+            return
+        await ctx.reply(
+            f"Loaded `{self.model.path}` (generation {self.model.generation}) in {self.model.load_time:.2f}s."
+        )
+
+    @ai_admin.command(name="stats")
+    @is_owner()
+    async def ai_stats(self, ctx: Context):
+        """shows model load time and memory usage."""
+        stats = self.model.stats()
+        batching = self.batcher.stats()
+        cache = self.verdicts.stats() if self.verdicts else None
+        prefilter = self.prefilter.stats()
+        scheduler = self.scheduler.stats()
+        reports = self.reports.stats()
+        await ctx.reply(
+            embed=Embed(title="AI Moderation", color=0xffffff)
+            .add_field(
+                name="Model",
+                value=f"Path: `{stats['path']}`\nGeneration: {stats['generation']}\n"
+                + f"Load time: {stats['load_time']:.2f}s\n"
+                + f"Model memory: {naturalsize(stats['memory'], binary=True)}\n"
+                + f"Process RSS: {naturalsize(stats['rss'], binary=True)}",
+            )
+            .add_field(
+                name="Batching",
+                value=f"Batches: {batching['batches']}\n"
+                + f"Average size: {batching['average_batch']:.1f}\n"
+                + f"Largest: {batching['largest_batch']}\n"
+                + f"Queued: {batching['queued']}",
+            )
+            .add_field(
+                name="Workers",
+                value=f"Processes: {self.workers.workers}\nRestarts: {self.workers.restarts}"
+                if self.workers
+                else "Thread pool",
+            )
+            .add_field(
+                name="Verdict Cache",
+                value=f"Entries: {cache['entries']}\n"
+                + f"Memory: {naturalsize(cache['memory'], binary=True)}\n"
+                + f"Hits: {cache['hits']} / Misses: {cache['misses']}\n"
+                + f"Hit rate: {cache['hit_rate']:.0%}"
+                if cache
+                else "Disabled",
+            )
+            .add_field(
+                name="Pre-filter",
+                value="\n".join(
+                    f"`{rule}`: {count}" for rule, count in prefilter.items()
+                )
+                or "No messages yet",
+            )
+            .add_field(
+                name="Pipeline",
+                value="\n".join(
+                    f"`{name}`: {stage['depth']}/{stage['max_depth']} queued, "
+                    + f"p50 {stage['p50'] * 1000:.1f}ms, p95 {stage['p95'] * 1000:.1f}ms, "
+                    + f"{stage['errors']} errors"
+                    for name, stage in self.pipeline.stats().items()
+                ),
+                inline=False,
+            )
+            .add_field(
+                name="Scheduler",
+                value=f"Waiting: {scheduler['pending']} in {scheduler['guilds']} guilds\n"
+                + f"Running: {scheduler['running']}\n"
+                + f"Deferred: {scheduler['deferred']}\n"
+                + f"Dropped: {scheduler['dropped']}",
+            )
+            .add_field(name="Time to Report", value=self.report_latency.format())
+            .add_field(
+                name="Reports",
+                value=f"Sent: {reports['reports']} in {reports['messages']} messages\n"
+                + f"Queued: {reports['queued']}\n"
+                + f"Dropped: {reports['dropped']}",
+            )
+            .add_field(name="Scanned", value=str(self.bot.scanned_messages_count))
+        )
 
     def build_view(self, message: AiPartialMessage, disabled: bool = False) -> View:
         """builds an interactions view for the flagged message. the id's carry all required information to act on the message.
@@ -69,28 +342,29 @@ class AiModeration(Cog):
         Returns:
             View: the built view
         """
+        target = f"{message.channel_id}:{message.message_id}:{message.author_id}"
         delete_button: Button = Button(
             style=ButtonStyle.gray,
             label="Delete",
-            custom_id=f"flagged_message_options:delete-{message.channel_id}-{message.message_id}",
+            custom_id=f"ai:delete:{target}",
             disabled=disabled,
         )
         timeout_button: Button = Button(
             style=ButtonStyle.gray,
             label="Timeout [1d]",
-            custom_id=f"flagged_message_options:timeout-{message.channel_id}-{message.message_id}",
+            custom_id=f"ai:timeout:{target}",
             disabled=disabled,
         )
         kick_button: Button = Button(
             style=ButtonStyle.red,
             label="Kick",
-            custom_id=f"flagged_message_options:kick-{message.channel_id}-{message.message_id}",
+            custom_id=f"ai:kick:{target}",
             disabled=disabled,
         )
         ban_button: Button = Button(
             style=ButtonStyle.red,
             label="Ban",
-            custom_id=f"flagged_message_options:ban-{message.channel_id}-{message.message_id}",
+            custom_id=f"ai:ban:{target}",
             disabled=disabled,
         )
         jump_button: Button = Button(
@@ -102,57 +376,164 @@ class AiModeration(Cog):
         items = (jump_button, delete_button, timeout_button, kick_button, ban_button)
         return View(*items, timeout=None)
 
+    def build_digest_view(self, messages: list[AiPartialMessage]) -> View:
+        """builds a combined view for a digest of flagged messages.
+
+        there is one select menu per action, and every option carries the channel, message and
+        author id of a report in the digest, numbered in the same order as the embeds.
+
+        Args:
+            messages (list[AiPartialMessage]): the messages in the digest, up to 10.
+
+        Returns:
+            View: the built view
+        """
+        options = [
+            SelectOption(
+                label=f"#{number} {message.content[:90]}",
+                value=f"{message.channel_id}:{message.message_id}:{message.author_id}",
+            )
+            for number, message in enumerate(messages, 1)
+        ]
+        selects = (
+            Select(
+                custom_id=f"ai_digest:{action}",
+                placeholder=placeholder,
+                options=options,
+                max_values=len(options),
+            )
+            for action, placeholder in (
+                ("delete", "Delete messages..."),
+                ("timeout", "Timeout authors [1d]..."),
+                ("kick", "Kick authors..."),
+                ("ban", "Ban authors..."),
+            )
+        )
+        return View(*selects, timeout=None)
+
+    async def take_action(
+        self,
+        guild: Guild,
+        moderator: str,
+        action: str,
+        channel_id: int,
+        message_id: int,
+        author_id: int,
+    ) -> str:
+        """runs a moderator action on a flagged message using only its ids, without fetching anything.
+
+        the message is deleted at the same time as the author is punished, so every action
+        costs a single round trip.
+
+        Returns:
+            str: a description of what happened.
+        """
+        reason = f"Flagged message by AI moderation. Actioned by {moderator}."
+        requests: list[Awaitable[Any]] = [
+            self.bot.http.delete_message(channel_id, message_id, reason=reason)
+        ]
+        if action == "timeout":
+            requests.append(
+                self.bot.http.edit_member(
+                    guild.id,
+                    author_id,
+                    reason=reason,
+                    communication_disabled_until=(utcnow() + timedelta(days=1)).isoformat(),
+                )
+            )
+            result = f"<@{author_id}> has been timed out for 1 day."
+        elif action == "kick":
+            requests.append(guild.kick(Object(author_id), reason=reason))
+            result = f"<@{author_id}> has been kicked."
+        elif action == "ban":
+            requests.append(guild.ban(Object(author_id), reason=reason))
+            result = f"<@{author_id}> has been banned."
+        elif action == "delete":
+            result = "Message deleted."
+        else:
+            raise ValueError(f"unknown action {action}.")
+
+        # the message may already be gone, which shouldn't stop the punishment
+        deleted, *punished = await gather(*requests, return_exceptions=True)
+        for error in punished:
+            if isinstance(error, Exception):
+                raise error
+        if isinstance(deleted, Exception) and not isinstance(deleted, NotFound):
+            raise deleted
+        return result
+
+    async def legacy_target(self, channel_id: int, message_id: int) -> tuple[int, int, int]:
+        # reports sent before the author id was part of the custom id need one lookup
+        channel = await self.bot.getch_channel(channel_id)
+        message = await channel.fetch_message(message_id) # type: ignore
+        return channel_id, message_id, message.author.id
+
     @Cog.listener()
     async def on_interaction(self, interaction: Interaction):
         # handles what happens when a view is interacted with
 
         # check if the interaction is relevant. if not, end early.
+        custom_id = interaction.custom_id
         if (
-            not interaction.custom_id
-            or not interaction.message
-            or not interaction.custom_id.startswith("flagged_message_options")
+            not custom_id
+            or not interaction.guild
+            or not custom_id.startswith(("ai:", "ai_digest:", "flagged_message_options:"))
         ):
             return
 
-        # get the data we stored in the custom_id
-        cleaned_id = interaction.custom_id.split(":")[1]
-        action, msg_channel_id, msg_id = cleaned_id.split("-")
-        channel = await self.bot.getch_channel(int(msg_channel_id))
-        message = await channel.fetch_message(int(msg_id)) # type: ignore
-        
-        # appease linter
-        if not message.guild:
-            return
-        
-        if action == "delete":
-            await message.delete()
-            await interaction.response.send_message("Message deleted.", ephemeral=True)
-        elif action == "timeout":
-            await message.delete()
-            author = await message.guild.fetch_member(message.author.id)
-            await author.timeout_for(timedelta(days=1))
-            await interaction.response.send_message(
-                f"{message.author} has been timed out for 1 day.", ephemeral=True
-            )
-        elif action == "kick":
-            await message.delete()
-            await message.guild.kick(
-                message.author.id, # type: ignore
-                f"Flagged message by AI moderation. Kicked by {interaction.user}.",
-            )
-            await interaction.response.send_message(
-                f"{message.author} has been kicked.", ephemeral=True
-            )
-        elif action == "ban":
-            await message.delete()
-            await message.guild.ban(message.author.id) # type: ignore
-            await interaction.response.send_message(
-                f"{message.author} has been banned.", ephemeral=True
+        # acknowledge right away, the actions happen after this
+        await interaction.response.defer()
+
+        if custom_id.startswith("ai_digest:"):
+            action = custom_id.split(":")[1]
+            targets = [
+                tuple(int(part) for part in value.split(":"))
+                for value in interaction.data.get("values", ()) # type: ignore
+            ]
+        elif custom_id.startswith("ai:"):
+            _, action, *ids = custom_id.split(":")
+            targets = [tuple(int(part) for part in ids)]
+        else:
+            action, msg_channel_id, msg_id = custom_id.split(":")[1].split("-")
+            targets = [await self.legacy_target(int(msg_channel_id), int(msg_id))]
+
+        results = []
+        for channel_id, message_id, author_id in targets:
+            # ignore double clicks, and two moderators acting on the same report at once
+            if (message_id, action) in self.handled:
+                results.append(f"Message {message_id} is already being handled.")
+                continue
+            self.handled[(message_id, action)] = True
+            try:
+                results.append(
+                    await self.take_action(
+                        interaction.guild,
+                        str(interaction.user),
+                        action,
+                        channel_id,
+                        message_id,
+                        author_id,
+                    )
+                )
+            except Exception as e:
+                del self.handled[(message_id, action)]
+                results.append(f"Failed to {action} for message {message_id}: {e}")
+        await interaction.followup.send("\n".join(results), ephemeral=True)
+
+        if not custom_id.startswith("ai_digest:") and interaction.message:
+            channel_id, message_id, author_id = targets[0]
+            await interaction.edit_original_response(
+                view=self.build_view(
+                    AiPartialMessage(
+                        guild_id=interaction.guild.id,
+                        channel_id=channel_id,
+                        content="",
+                        message_id=message_id,
+                        author_id=author_id,
+                    ),
+                    disabled=True,
+                ),
             )
-        await interaction.message.edit(
-            embed=interaction.message.embeds[0],
-            view=self.build_view(AiPartialMessage.from_message(message), disabled=True),
-        )
 
     @Cog.listener()
     async def on_message(self, message: Message):
@@ -162,65 +543,119 @@ class AiModeration(Cog):
         if not message.content:
             return
 
-        guild_settings = await self.bot.db.get_guild_settings(message.guild.id)
-        if not guild_settings or not guild_settings.ai_reports_channel:
-            return
+        # queue the scan instead of awaiting it, so a flood can't pile up unbounded work
+        self.scheduler.submit(
+            message.guild.id, partial(self.pipeline.submit, ScanContext(message))
+        )
 
-        await self.scan_message(message, guild_settings.ai_reports_channel)
+    async def gate(self, scan: ScanContext) -> Optional[ScanContext]:
+        # only guilds with AI moderation enabled, and only messages the pre-filter lets through
+        message = scan.message
+        settings = await self.bot.db.get_guild_settings(message.guild.id) # type: ignore
+        if not settings or not settings.ai_reports_channel:
+            return None
 
-    async def scan_message(self, msg: Message, reports_channel_id: int):
-        if not msg.guild:
+        decision, rule = self.prefilter.decide(
+            message.content,
+            message.channel.id,
+            [role.id for role in getattr(message.author, "roles", ())],
+            settings.ai_ignored_channels,
+            settings.ai_ignored_roles,
+        )
+        if decision is Decision.SKIP:
+            return None
+        if decision is Decision.FLAG:
+            # a keyword match is reported as certain without asking the model
+            scan.score = {rule: 1.0}
+        scan.settings = settings
+        return scan
+
+    async def normalize(self, scan: ScanContext) -> Optional[ScanContext]:
+        # repeated content is answered from the verdict cache
+        if scan.score is None and self.verdicts:
+            scan.key = content_key(scan.message.content)
+            scan.score = self.verdicts.get(scan.key)
+        return scan
+
+    async def infer(self, scan: ScanContext) -> Optional[ScanContext]:
+        if scan.score is None:
+            scan.score = await self.classify(scan.message.content, scan.key)
+            self.bot.scanned_messages_count += 1
+        return scan
+
+    async def decide(self, scan: ScanContext) -> Optional[ScanContext]:
+        logger.info(f"message {scan.message.id} has probability: {scan.score}")
+        return scan if scan.score and is_toxic(scan.score) else None
+
+    async def report(self, scan: ScanContext) -> None:
+        msg, settings = scan.message, scan.settings
+        if not settings or not settings.ai_reports_channel or not scan.score:
             return
-        
+        self.reports.submit(
+            settings.ai_reports_channel,
+            (
+                AiPartialMessage.from_message(msg, settings.ai_reports_channel),
+                self.build_report(msg, scan.score),
+                perf_counter(),
+            ),
+            digest=settings.ai_digest,
+        )
+
+    def build_report(self, msg: Message, score: dict[str, float]) -> Embed:
+        """builds the report embed for a flagged message from data that's already on the message.
+
+        Args:
+            msg (Message): the flagged message.
+            score (dict[str, float]): the label -> probability scores, highest first.
+
+        Returns:
+            Embed: the report embed.
+        """
+        author = msg.author
         content = msg.content
-        message_id = msg.id
-        try:
-            loop = get_running_loop()
-            model = await loop.run_in_executor(
-                None, lambda: load_model("src/cogs/model.bin")
-            )
-            _score = await loop.run_in_executor(
-                None, lambda: model.predict(content, k=6)
-            )
-            logger.info(_score)
-
-            score = {
-                label.replace("__label__", ""): score
-                for label, score in zip(_score[0], _score[1])
-            }
-            logger.info(f"message {message_id} has probability: {score}")
-            if score.get("non_toxic", 0) < 0.5:
-                guild = await self.bot.fetch_guild(msg.guild.id)
-                author = await guild.fetch_member(msg.author.id)
-                reports_channel: TextChannel = await self.bot.getch_channel(reports_channel_id) # type: ignore
-                embed = (
-                    Embed(
-                        title="Message Flagged",
-                        description=f"Highest score was **{next(iter(score.keys()))}** with a percentage of **{round(next(iter(score.values()))*100)}%**.\n"
-                        + "\n".join(
-                            f"`{f}`: **{round(s*100)}%**"
-                            for f, s in list(i for i in score.items())[1:4]
-                        ),
-                        color=0xffffff,
-                    )
-                    .set_author(
-                        name=f"{str(author).replace('#0','')} ({author.id})",
-                        icon_url=author.display_avatar.url,
-                    )
-                    .set_footer(
-                        text=f"Message ID: {message_id} • Author ID: {author.id}"
-                    )
-                    .add_field(
-                        name="Message Content",
-                        value=f'||{content[:100]}{("..." if len(content) > 100 else "")}||',
-                    )
-                )
-                await reports_channel.send(
-                    embed=embed,
-                    view=self.build_view(AiPartialMessage.from_message(msg)),
-                )
-        except Exception as e:  # don't die if you fail once
-            logger.error(f"error while scanning message {message_id}: {e}")
+        return (
+            Embed(
+                title="Message Flagged",
+                description=f"Highest score was **{next(iter(score.keys()))}** with a percentage of **{round(next(iter(score.values()))*100)}%**.\n"
+                + "\n".join(
+                    f"`{f}`: **{round(s*100)}%**"
+                    for f, s in list(i for i in score.items())[1:4]
+                ),
+                color=0xffffff,
+            )
+            .set_author(
+                name=f"{str(author).replace('#0','')} ({author.id})",
+                icon_url=author.display_avatar.url,
+            )
+            .set_footer(
+                text=f"Message ID: {msg.id} • Author ID: {author.id}"
+            )
+            .add_field(
+                name="Message Content",
+                value=f'||{content[:100]}{("..." if len(content) > 100 else "")}||',
+            )
+        )
+
+    async def send_reports(
+        self, reports_channel_id: int, reports: list[tuple[AiPartialMessage, Embed, float]]
+    ):
+        """sends one report on its own, or several as a single digest message."""
+        # the author came with the message and the channel is almost always cached,
+        # so this normally doesn't touch the API until the report is sent
+        reports_channel: TextChannel = await self.bot.getch_channel(reports_channel_id) # type: ignore
+        if len(reports) == 1:
+            message, embed, _ = reports[0]
+            await reports_channel.send(embed=embed, view=self.build_view(message))
+        else:
+            for number, (message, embed, _) in enumerate(reports, 1):
+                embed.title = f"Message Flagged #{number}"
+                embed.url = f"https://discord.com/channels/{message.guild_id}/{message.channel_id}/{message.message_id}"
+            await reports_channel.send(
+                embeds=[embed for _, embed, _ in reports],
+                view=self.build_digest_view([message for message, _, _ in reports]),
+            )
+        for _, _, flagged_at in reports:
+            self.report_latency.record(perf_counter() - flagged_at)
 
 
 def setup(bot: Glyph):
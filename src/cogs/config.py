@@ -1,7 +1,7 @@
 from src.bot import Glyph
 from discord.ext.commands import Cog
 from discord.commands import SlashCommandGroup
-from discord import Option, ApplicationContext, TextChannel, Embed, Permissions
+from discord import Option, ApplicationContext, TextChannel, Embed, Permissions, Role
 from src.db import GuildSettings
 from src.views import CreateTicket
 
@@ -17,6 +17,7 @@ class Config(Cog):
     ai_config = config.create_subgroup(
         "ai", "Configure the AI moderation for your server."
     )
+    warns_config = config.create_subgroup("warns", "Configure warnings for your server.")
 
     @ai_config.command(
         name="setchannel",
@@ -38,7 +39,7 @@ class Config(Cog):
                 guild_id=ctx.guild.id, ai_reports_channel=reports_channel.id
             )
         else:
-            settings.ai_reports_channel = reports_channel.id
+            settings = settings.replace(ai_reports_channel=reports_channel.id)
         perms: Permissions = reports_channel.permissions_for(ctx.guild.me)
         if not perms.send_messages:
             await ctx.respond(
@@ -66,7 +67,7 @@ class Config(Cog):
         if not settings:
             settings = GuildSettings(guild_id=ctx.guild.id, ai_reports_channel=None)
         else:
-            settings.ai_reports_channel = None
+            settings = settings.replace(ai_reports_channel=None)
         await self.bot.db.set_guild_settings(ctx.guild.id, settings)
         await ctx.respond(
             embed=Embed(
@@ -76,6 +77,123 @@ class Config(Cog):
             )
         )
 
+    @ai_config.command(
+        name="ignorechannel",
+        description="Toggle whether AI moderation skips a channel.",
+    )
+    async def ai_ignore_channel(
+        self,
+        ctx: ApplicationContext,
+        channel: Option(
+            TextChannel,
+            description="Channel AI moderation should skip, or stop skipping.",
+            required=True,
+        ),
+    ):
+        settings = await self.bot.db.get_guild_settings(ctx.guild.id) or GuildSettings(
+            guild_id=ctx.guild.id
+        )
+        if channel.id in settings.ai_ignored_channels:
+            settings = settings.replace(
+                ai_ignored_channels=[c for c in settings.ai_ignored_channels if c != channel.id]
+            )
+            description = f"AI moderation will scan {channel.mention} again."
+        else:
+            settings = settings.replace(
+                ai_ignored_channels=[*settings.ai_ignored_channels, channel.id]
+            )
+            description = f"AI moderation will no longer scan {channel.mention}."
+        await self.bot.db.set_guild_settings(ctx.guild.id, settings)
+        await ctx.respond(
+            embed=Embed(description=description, color=0xffffff).set_author(
+                name="AI Moderation Updated"
+            )
+        )
+
+    @ai_config.command(
+        name="ignorerole",
+        description="Toggle whether AI moderation skips members with a role.",
+    )
+    async def ai_ignore_role(
+        self,
+        ctx: ApplicationContext,
+        role: Option(
+            Role,
+            description="Role AI moderation should skip, or stop skipping.",
+            required=True,
+        ),
+    ):
+        settings = await self.bot.db.get_guild_settings(ctx.guild.id) or GuildSettings(
+            guild_id=ctx.guild.id
+        )
+        if role.id in settings.ai_ignored_roles:
+            settings = settings.replace(
+                ai_ignored_roles=[r for r in settings.ai_ignored_roles if r != role.id]
+            )
+            description = f"AI moderation will scan members with {role.mention} again."
+        else:
+            settings = settings.replace(
+                ai_ignored_roles=[*settings.ai_ignored_roles, role.id]
+            )
+            description = f"AI moderation will no longer scan members with {role.mention}."
+        await self.bot.db.set_guild_settings(ctx.guild.id, settings)
+        await ctx.respond(
+            embed=Embed(description=description, color=0xffffff).set_author(
+                name="AI Moderation Updated"
+            )
+        )
+
+    @ai_config.command(
+        name="digest",
+        description="Send AI reports in batched digests instead of one message each.",
+    )
+    async def ai_digest(
+        self,
+        ctx: ApplicationContext,
+        enabled: Option(bool, description="Whether to use digests.", required=True),
+    ):
+        settings = await self.bot.db.get_guild_settings(ctx.guild.id) or GuildSettings(
+            guild_id=ctx.guild.id
+        )
+        settings = settings.replace(ai_digest=enabled)
+        await self.bot.db.set_guild_settings(ctx.guild.id, settings)
+        await ctx.respond(
+            embed=Embed(
+                description="Flagged messages will be collected and reported together."
+                if enabled
+                else "Flagged messages will be reported one at a time.",
+                color=0xffffff,
+            ).set_author(name="AI Moderation Updated")
+        )
+
+    @warns_config.command(
+        name="retention",
+        description="Delete warns automatically once they are a number of days old.",
+    )
+    async def warns_retention(
+        self,
+        ctx: ApplicationContext,
+        days: Option(
+            int,
+            description="How many days warns are kept, 0 to keep them forever.",
+            required=True,
+            min_value=0,
+        ),
+    ):
+        settings = await self.bot.db.get_guild_settings(ctx.guild.id) or GuildSettings(
+            guild_id=ctx.guild.id
+        )
+        settings = settings.replace(warn_retention_days=days or None)
+        await self.bot.db.set_guild_settings(ctx.guild.id, settings)
+        await ctx.respond(
+            embed=Embed(
+                description=f"Warns will be deleted once they are {days} day(s) old."
+                if days
+                else "Warns will be kept forever.",
+                color=0xffffff,
+            ).set_author(name="Warnings Updated")
+        )
+
     @config.command(
         name="view", description="See the bot's configuration for your server."
     )
@@ -95,7 +213,14 @@ class Config(Cog):
             )
             .add_field(
                 name="AI Moderation",
-                value=f"Enabled: {settings.ai_reports_channel is not None}\nReports Channel: {f'<#{settings.ai_reports_channel}>' if settings.ai_reports_channel is not None else 'None'}",
+                value=f"Enabled: {settings.ai_reports_channel is not None}\nReports Channel: {f'<#{settings.ai_reports_channel}>' if settings.ai_reports_channel is not None else 'None'}"
+                + f"\nIgnored Channels: {', '.join(f'<#{c}>' for c in settings.ai_ignored_channels) or 'None'}"
+                + f"\nIgnored Roles: {', '.join(f'<@&{r}>' for r in settings.ai_ignored_roles) or 'None'}"
+                + f"\nDigest Reports: {settings.ai_digest}",
+            )
+            .add_field(
+                name="Warnings",
+                value=f"Retention: {f'{settings.warn_retention_days} days' if settings.warn_retention_days else 'Forever'}",
             )
         )
 
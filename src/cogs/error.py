@@ -3,6 +3,7 @@ from discord.ext.commands import Cog
 from src.bot import Glyph
 from discord.errors import Forbidden, HTTPException, NotFound
 from discord import Embed
+from src.db import DatabaseUnavailable
 
 
 class Error(Cog):
@@ -21,6 +22,9 @@ class Error(Cog):
         elif isinstance(error, NotFound):
             embed.description = "The requested resource was not found."
             await ctx.respond(embed=embed, ephemeral=True)
+        elif isinstance(getattr(error, "original", error), DatabaseUnavailable):
+            embed.description = "The database is having trouble right now, please try again in a moment."
+            await ctx.respond(embed=embed, ephemeral=True)
         else:
             raise error
 
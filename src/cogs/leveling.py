@@ -0,0 +1,42 @@
+from src.bot import Glyph
+from discord.ext.commands import slash_command, Cog
+from discord import Embed, Member, Option, ApplicationContext
+
+
+class Leveling(Cog):
+    def __init__(self, bot: Glyph):
+        self.bot = bot
+
+    @slash_command(name="leaderboard", description="Shows the users with the most XP")
+    async def leaderboard(self, ctx: ApplicationContext):
+        top = await self.bot.db.leaderboard.top(10)
+        if not top:
+            await ctx.respond(embed=Embed(colour=0xffffff, title="Nobody has any XP yet"))
+            return
+        embed = Embed(
+            colour=0xffffff,
+            title="XP Leaderboard",
+            description="\n".join(
+                f"**#{position}** <@{user_id}> • {xp} XP"
+                for position, (user_id, xp) in enumerate(top, 1)
+            ),
+        )
+        await ctx.respond(embed=embed)
+
+    @slash_command(name="rank", description="Shows your XP rank | /rank <member>")
+    async def rank(
+        self,
+        ctx: ApplicationContext,
+        member: Option(Member, description="The member to show the rank of", required=False),
+    ):
+        member = member or ctx.author
+        position, xp = await self.bot.db.leaderboard.rank(member.id)
+        embed = Embed(
+            colour=0xffffff,
+            description=f"{member.mention} is rank **#{position}** with **{xp}** XP",
+        )
+        await ctx.respond(embed=embed)
+
+
+def setup(bot: Glyph):
+    bot.add_cog(Leveling(bot))
@@ -6,10 +6,15 @@ from discord.ext.commands import (
     cooldown,
     BucketType,
 )
-from discord import Embed, Option, ApplicationContext, Member, Colour, Role
+from discord import Embed, Option, ApplicationContext, Member, Colour, Role, File, Attachment
 from discord.ext.commands.errors import MissingPermissions, CommandOnCooldown
-from datetime import timedelta
+from csv import DictReader, writer
+from datetime import datetime, timedelta
 from humanize import naturaldelta
+from io import StringIO, TextIOWrapper
+from tempfile import TemporaryFile
+from src.db import Warn
+from src.views import WarnPages
 
 
 class Moderation(Cog):
@@ -163,7 +168,7 @@ class Moderation(Cog):
         await ctx.respond(embed=embed)
 
     @slash_command(
-        name="unwarn", description="Delete all of someone's warn(s) | /unwarn [member]"
+        name="unwarn", description="Delete someone's warn(s) | /unwarn [member] <ids>"
     )
     @has_permissions(manage_guild=True)
     async def unwarn(
@@ -174,22 +179,91 @@ class Moderation(Cog):
             description="The member you want to remove the warns from",
             required=True,
         ),
+        ids: Option(
+            str,
+            description="Comma separated warn IDs to remove, all of them if left empty",
+            required=False,
+        ),
     ):
-        async with self.bot.db.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(
-                    "DELETE FROM warns WHERE user = ? AND guild = ?",
-                    (member.id, ctx.guild.id),
-                )
-                embed = Embed(
-                    colour=Colour.green(),
-                    description=f"Removed all of {member.mention}'s warn(s)",
-                )
-                embed.set_author(
-                    name="Success",
-                    icon_url="https://cdn.discordapp.com/emojis/1055805763651641355.webp?size=96&quality=lossless",
+        if ids:
+            try:
+                warn_ids = {int(id) for id in ids.replace(" ", "").split(",") if id}
+            except ValueError:
+                await ctx.respond(f"Invalid warn IDs `{ids}`", ephemeral=True)
+                return
+            # only this member's warns, so a typo can't remove someone else's
+            deleted = await self.bot.db.delete_warns_by_id(ctx.guild.id, warn_ids, member.id)
+        else:
+            deleted = await self.bot.db.delete_warns(member.id, ctx.guild.id)
+        embed = Embed(
+            colour=Colour.green(),
+            description=f"Removed {deleted} of {member.mention}'s warn(s)",
+        )
+        embed.set_author(
+            name="Success",
+            icon_url="https://cdn.discordapp.com/emojis/1055805763651641355.webp?size=96&quality=lossless",
+        )
+        await ctx.respond(embed=embed)
+
+    @slash_command(
+        name="clearwarns", description="Delete every warn older than a number of days"
+    )
+    @has_permissions(manage_guild=True)
+    async def clearwarns(
+        self,
+        ctx: ApplicationContext,
+        days: Option(int, description="Warns older than this are deleted", min_value=0),
+    ):
+        cutoff = datetime.now().timestamp() - days * 86400
+        deleted = await self.bot.db.delete_warns_before(ctx.guild.id, cutoff)
+        embed = Embed(
+            colour=Colour.green(),
+            description=f"Removed {deleted} warn(s) older than {days} day(s)",
+        )
+        embed.set_author(
+            name="Success",
+            icon_url="https://cdn.discordapp.com/emojis/1055805763651641355.webp?size=96&quality=lossless",
+        )
+        await ctx.respond(embed=embed)
+
+    @slash_command(
+        name="importwarns", description="Imports warns from a CSV file, like the one /exportwarns makes"
+    )
+    @has_permissions(manage_guild=True)
+    @cooldown(1, 60, BucketType.guild)
+    async def importwarns(
+        self,
+        ctx: ApplicationContext,
+        file: Option(
+            Attachment, description="A CSV file with user_id, reason and time (unix seconds) columns"
+        ),
+    ):
+        await ctx.defer()
+        try:
+            rows = DictReader(StringIO((await file.read()).decode("utf-8-sig")))
+            warns = [
+                Warn(
+                    int(row["user_id"]),
+                    row.get("reason") or "No reason specified",
+                    int(float(row["time"])),
+                    ctx.guild.id,
                 )
-                await ctx.respond(embed=embed)
+                for row in rows
+            ]
+        except (KeyError, ValueError, TypeError, UnicodeDecodeError):
+            await ctx.respond(
+                "Invalid file, it needs a header row with `user_id`, `reason` and `time` columns",
+                ephemeral=True,
+            )
+            return
+        # every row goes to the database in one COPY
+        imported = await self.bot.db.import_warns(warns)
+        embed = Embed(colour=Colour.green(), description=f"Imported {imported} warn(s)")
+        embed.set_author(
+            name="Success",
+            icon_url="https://cdn.discordapp.com/emojis/1055805763651641355.webp?size=96&quality=lossless",
+        )
+        await ctx.respond(embed=embed)
 
     @slash_command(
         name="warns", description="Shows someone's warnings | /warrns [member]"
@@ -198,23 +272,44 @@ class Moderation(Cog):
         self,
         ctx: ApplicationContext,
         member: Option(Member, description="The member's warns", required=True),
+        archived: Option(
+            bool, description="Include old, archived warns", required=False, default=False
+        ),
     ):
-        rows = await self.bot.db.get_warns(member.id, ctx.guild.id)
-        if rows:
-            rows.sort(key=lambda x: x.time, reverse=True)
-            embed = Embed(colour=0xffffff, title=f"Warnings for {member.name}")
-            warnnum = 0
-            for row in rows:
-                warnnum += 1
-                embed.add_field(
-                    name=f"Warning #{warnnum}",
-                    value=f"**Reason:** {row.reason} | **Date:** <t:{int(row.time)}:F>",
-                )
-            await ctx.respond(embed=embed)
+        total = await self.bot.db.count_warns(member.id, ctx.guild.id, archived)
+        if total:
+            view = WarnPages(self.bot.db, member, ctx.author.id, total, archived=archived)
+            embed = await view.load()
+            # a single page doesn't need buttons
+            await ctx.respond(embed=embed, view=view if view.pages > 1 else None)
         else:
             embed = Embed(colour=0xffffff, title=f"No warnings for {member.name}")
             await ctx.respond(embed=embed)
 
+    @slash_command(
+        name="exportwarns", description="Exports every warn of this server as a CSV file"
+    )
+    @has_permissions(manage_guild=True)
+    @cooldown(1, 60, BucketType.guild)
+    async def exportwarns(self, ctx: ApplicationContext):
+        await ctx.defer()
+        # rows go straight from the database cursor to a file on disk, so memory use
+        # doesn't grow with the size of the warn log
+        with TemporaryFile() as f:
+            text = TextIOWrapper(f, encoding="utf-8", newline="")
+            rows = writer(text)
+            rows.writerow(("id", "user_id", "reason", "time"))
+            count = 0
+            async for warn in self.bot.db.export_warns(ctx.guild.id):
+                rows.writerow((warn.id, warn.user_id, warn.reason, int(warn.time)))
+                count += 1
+            text.detach()
+            f.seek(0)
+            await ctx.respond(
+                f"Exported {count} warn(s)",
+                file=File(f, filename=f"warns-{ctx.guild.id}.csv"),
+            )
+
     @slash_command(name="timeout", description="Puts a member in timeout")
     async def timeout(
         self,
@@ -0,0 +1,799 @@
+from __future__ import annotations
+from cachetools import LRUCache, TLRUCache, TTLCache
+from collections import defaultdict
+from dataclasses import dataclass
+from msgpack import packb, unpackb # type: ignore
+from os import environ
+from operator import attrgetter, itemgetter
+from logging import getLogger
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Optional, TypeVar
+from asyncpg import Record # type: ignore
+from asyncio import Task, TimeoutError, create_task, shield, sleep, wait_for
+from datetime import datetime
+from time import perf_counter
+
+from src.db.backends import BACKENDS, CONNECTION_ERRORS, Backend, MemoryBackend, PostgresBackend
+from src.db.compaction import WarnCompactor
+from src.db.health import CircuitBreaker, CircuitOpen, DatabaseUnavailable
+from src.db.journal import WriteJournal
+from src.db.leaderboard import Leaderboard
+from src.db.queries import REPLICA_QUERIES
+from src.db.xp import XpBuffer
+from src.metrics import LatencyTracker
+
+__all__ = (
+    "BACKENDS",
+    "Backend",
+    "CircuitOpen",
+    "Database",
+    "DatabaseConfig",
+    "DatabaseUnavailable",
+    "GuildSettings",
+    "Leveling",
+    "MemoryBackend",
+    "MsgPackMixin",
+    "PostgresBackend",
+    "SettingsCache",
+    "WARN_COPY_COLUMNS",
+    "WARN_CURSOR_START",
+    "Warn",
+)
+
+
+logger = getLogger(__name__)
+T = TypeVar("T")
+
+
+class MsgPackMixin:
+    """fast (de)serialization for slotted classes.
+
+    the codec is built once per class from its `__slots__`, which must list the fields in the
+    same order as `__init__` takes them. objects are packed as positional msgpack arrays.
+    """
+
+    __slots__ = ()
+    _fields: tuple[str, ...]
+    _getter: Callable[[Any], tuple[Any, ...]]
+    _record_getter: Callable[[Any], tuple[Any, ...]]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(cls.__slots__)
+        getter = attrgetter(*cls._fields)
+        # attrgetter returns a bare value instead of a tuple for a single field
+        cls._getter = getter if len(cls._fields) > 1 else lambda obj: (getter(obj),)
+        record_getter = itemgetter(*cls._fields)
+        cls._record_getter = (
+            record_getter if len(cls._fields) > 1 else lambda record: (record_getter(record),)
+        )
+
+    def serialize(self) -> bytes:
+        return packb(self._getter(self))
+
+    def as_dict(self) -> dict[str, Any]:
+        return dict(zip(self._fields, self._getter(self)))
+
+    @classmethod
+    def from_data(cls, data: bytes):
+        return cls(*unpackb(data))
+
+    @classmethod
+    def from_record(cls, record: Record):
+        """builds the object straight from an asyncpg row that has a column for every field."""
+        return cls(*cls._record_getter(record))
+
+
+@dataclass
+class DatabaseConfig:
+    """runtime settings for the database layer. every field can be set with a `DB_*` environment variable."""
+
+    # where data is stored: "postgres", or "memory" to run without a database server
+    backend: str = "postgres"
+
+    # guilds whose settings are kept in memory
+    settings_cache_size: int = 10_000
+    # seconds cached settings of guilds with AI moderation enabled stay valid
+    settings_ttl: float = 300.0
+    # seconds cached settings of guilds with AI moderation disabled stay valid. they are
+    # the vast majority and only change through set_guild_settings, which updates the cache
+    settings_negative_ttl: float = 3600.0
+    # seconds between writes of buffered xp grants, also the most xp time a crash can lose
+    xp_flush_interval: float = 5.0
+    # users with buffered xp that trigger an early write
+    xp_max_pending: int = 5000
+    # users kept in the in-memory leaderboard
+    leaderboard_size: int = 100
+    # seconds between full leaderboard reloads
+    leaderboard_interval: float = 60.0
+    # seconds reads go to the primary after a write to the same data, longer than replica lag
+    replica_pin_seconds: float = 5.0
+    # days warns stay in the hot table before they're moved to the archive
+    warn_hot_days: float = 90.0
+    # seconds between warn compaction runs, 0 to disable
+    compaction_interval: float = 3600.0
+    # warns moved or deleted per statement during compaction
+    compaction_batch_size: int = 1000
+    # seconds a query may take before it counts as a database failure
+    query_timeout: float = 2.0
+    # failures in a row that put the database layer into degraded mode
+    breaker_threshold: int = 5
+    # seconds between health checks while degraded
+    breaker_reset: float = 10.0
+    # where writes made while degraded are kept until they can be replayed
+    journal_path: str = "db_journal.msgpack"
+    # writes the journal holds before further writes fail
+    journal_size: int = 10_000
+
+    @classmethod
+    def from_env(cls) -> DatabaseConfig:
+        """builds the config from environment variables, using the defaults for anything unset."""
+        return cls(
+            backend=environ.get("DB_BACKEND", cls.backend).lower(),
+            settings_cache_size=int(
+                environ.get("DB_SETTINGS_CACHE_SIZE", cls.settings_cache_size)
+            ),
+            settings_ttl=float(environ.get("DB_SETTINGS_TTL", cls.settings_ttl)),
+            settings_negative_ttl=float(
+                environ.get("DB_SETTINGS_NEGATIVE_TTL", cls.settings_negative_ttl)
+            ),
+            xp_flush_interval=float(
+                environ.get("DB_XP_FLUSH_INTERVAL", cls.xp_flush_interval)
+            ),
+            xp_max_pending=int(environ.get("DB_XP_MAX_PENDING", cls.xp_max_pending)),
+            leaderboard_size=int(environ.get("DB_LEADERBOARD_SIZE", cls.leaderboard_size)),
+            leaderboard_interval=float(
+                environ.get("DB_LEADERBOARD_INTERVAL", cls.leaderboard_interval)
+            ),
+            replica_pin_seconds=float(
+                environ.get("DB_REPLICA_PIN_SECONDS", cls.replica_pin_seconds)
+            ),
+            warn_hot_days=float(environ.get("DB_WARN_HOT_DAYS", cls.warn_hot_days)),
+            compaction_interval=float(
+                environ.get("DB_COMPACTION_INTERVAL", cls.compaction_interval)
+            ),
+            compaction_batch_size=int(
+                environ.get("DB_COMPACTION_BATCH_SIZE", cls.compaction_batch_size)
+            ),
+            query_timeout=float(environ.get("DB_QUERY_TIMEOUT", cls.query_timeout)),
+            breaker_threshold=int(environ.get("DB_BREAKER_THRESHOLD", cls.breaker_threshold)),
+            breaker_reset=float(environ.get("DB_BREAKER_RESET", cls.breaker_reset)),
+            journal_path=environ.get("DB_JOURNAL_PATH", cls.journal_path),
+            journal_size=int(environ.get("DB_JOURNAL_SIZE", cls.journal_size)),
+        )
+
+
+class _CountingTLRUCache(TLRUCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions: int = 0
+
+    # cachetools calls popitem only to make room, so this counts capacity evictions
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class SettingsCache:
+    """keeps ready-to-use GuildSettings snapshots in memory.
+
+    the snapshots are immutable, so they are handed out as-is without copying or unpacking.
+    guilds without AI moderation are cached longer (negative caching) than guilds with it.
+    the last known settings of each guild are kept past their expiry, to be served with
+    `get_stale` while the database can't be reached.
+    """
+
+    __slots__ = ("_cache", "_last_known", "hits", "misses", "stale_hits")
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0, negative_ttl: float = 3600.0):
+        def time_to_use(guild_id: int, settings: GuildSettings, now: float) -> float:
+            return now + (ttl if settings.ai_reports_channel else negative_ttl)
+
+        self._cache = _CountingTLRUCache(maxsize=maxsize, ttu=time_to_use)
+        # the same objects as in _cache, so this only costs the references
+        self._last_known: LRUCache[int, GuildSettings] = LRUCache(maxsize=maxsize)
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stale_hits: int = 0
+
+    def get(self, guild_id: int) -> Optional[GuildSettings]:
+        settings = self._cache.get(guild_id)
+        if settings is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return settings
+
+    def get_stale(self, guild_id: int) -> Optional[GuildSettings]:
+        """the last settings seen for a guild, however old they are."""
+        settings = self._last_known.get(guild_id)
+        if settings is not None:
+            self.stale_hits += 1
+        return settings
+
+    def known(self, guild_id: int) -> bool:
+        """whether settings of the guild were ever seen, even if they expired since."""
+        return guild_id in self._last_known
+
+    def put(self, settings: GuildSettings) -> None:
+        self._cache[settings.guild_id] = settings
+        self._last_known[settings.guild_id] = settings
+
+    def invalidate(self, guild_id: int) -> None:
+        self._cache.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._last_known.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._cache.evictions,
+            "stale_hits": self.stale_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        return f"<SettingsCache(entries={len(self._cache)}, hits={self.hits}, misses={self.misses})>"
+
+
+# larger than any (time, id) a warn can have, so the first page starts at the newest warn
+WARN_CURSOR_START = 2**63 - 1
+
+
+WARN_COPY_COLUMNS = ("user_id", "reason", "time", "guild")
+
+
+class Database:
+    __slots__ = (
+        "backend",
+        "config",
+        "settings_cache",
+        "_warming",
+        "query_latency",
+        "xp",
+        "leaderboard",
+        "compactor",
+        "_pinned",
+        "breaker",
+        "journal",
+        "health_check",
+        "on_recover",
+        "_recovery",
+    )
+
+    def __init__(
+        self,
+        backend: Backend,
+        config: Optional[DatabaseConfig] = None,
+        health_check: Optional[Callable[[], Awaitable[Any]]] = None,
+        on_recover: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        """
+        Args:
+            backend (Backend): where queries are sent.
+            config (Optional[DatabaseConfig], optional): Defaults to DatabaseConfig().
+            health_check (Optional[Callable[[], Awaitable[Any]]], optional): what to run to
+                see if the database is back after an outage, bound by the query timeout.
+                Defaults to a `SELECT 1`.
+            on_recover (Optional[Callable[[], Awaitable[Any]]], optional): what to run once
+                the health check passes, before the journal is replayed, e.g. migrations.
+                it may take as long as it needs. Defaults to None.
+        """
+        self.backend = backend
+        self.config = config or DatabaseConfig()
+        self.breaker = CircuitBreaker(threshold=self.config.breaker_threshold)
+        self.journal = WriteJournal(self.config.journal_path, self.config.journal_size)
+        self.health_check = health_check or (lambda: self.backend.fetchval("ping"))
+        self.on_recover = on_recover
+        self._recovery: Optional[Task[None]] = None
+        self.settings_cache = SettingsCache(
+            maxsize=self.config.settings_cache_size,
+            ttl=self.config.settings_ttl,
+            negative_ttl=self.config.settings_negative_ttl,
+        )
+        self._warming: Optional[Task[tuple[int, int, float]]] = None
+        self.query_latency: defaultdict[str, LatencyTracker] = defaultdict(LatencyTracker)
+        # scopes written to recently, read from the primary until the replicas caught up
+        self._pinned: TTLCache[Hashable, bool] = TTLCache(
+            maxsize=10_000, ttl=self.config.replica_pin_seconds
+        )
+        self.xp = XpBuffer(
+            self, interval=self.config.xp_flush_interval, max_pending=self.config.xp_max_pending
+        )
+        self.xp.start()
+        self.leaderboard = Leaderboard(
+            self, size=self.config.leaderboard_size, interval=self.config.leaderboard_interval
+        )
+        self.xp.on_write = self.leaderboard.update
+        self.leaderboard.start()
+        self.compactor = WarnCompactor(
+            self,
+            hot_days=self.config.warn_hot_days,
+            interval=self.config.compaction_interval,
+            batch_size=self.config.compaction_batch_size,
+        )
+        self.compactor.start()
+        if loaded := self.journal.load():
+            # writes from the last run never made it, replay them before anything else is written
+            logger.warning(f"found {loaded} journaled database writes, replaying them")
+            self.trip()
+
+    async def close(self) -> None:
+        """writes anything still buffered, then closes the backend."""
+        self.leaderboard.close()
+        self.compactor.close()
+        if self._recovery:
+            self._recovery.cancel()
+        try:
+            await self.xp.close()
+        finally:
+            await self.backend.close()
+
+    def pin(self, scope: Hashable) -> None:
+        """sends reads of `scope` to the primary for a while, e.g. right after writing to it.
+
+        replicas lag a little behind, so without this a read right after a write could miss it.
+        """
+        self._pinned[scope] = True
+
+    def _use_replica(self, name: str, scope: Optional[Hashable]) -> bool:
+        return name in REPLICA_QUERIES and (scope is None or scope not in self._pinned)
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.closed
+
+    def trip(self) -> None:
+        """puts the database layer into degraded mode until a health check passes.
+
+        while degraded every query fails fast with CircuitOpen, settings are served from what
+        was last seen and writes that can be are journaled.
+        """
+        self.breaker.open()
+        if self._recovery is None or self._recovery.done():
+            self._recovery = create_task(self._recover())
+
+    async def _recover(self) -> None:
+        while True:
+            try:
+                await wait_for(self.health_check(), self.config.query_timeout)
+                if self.on_recover:
+                    await self.on_recover()
+                await self._replay()
+            except Exception as e:
+                logger.warning(f"database still unavailable: {e!r}")
+                await sleep(self.config.breaker_reset)
+                continue
+            # nothing was awaited since the journal emptied, so no write can slip in between
+            self.breaker.close()
+            logger.info("database is available again")
+            return
+
+    async def _replay(self, batch_size: int = 100) -> None:
+        # writes keep being journaled during the replay, so they stay in order behind it
+        while self.journal:
+            now = int(datetime.now().timestamp())
+            while entries := self.journal.head(batch_size):
+                for key, name, args in entries:
+                    # None if it already ran, e.g. right before a crash or a timeout
+                    rows = await wait_for(
+                        self.backend.run_once(key, now, name, *args), self.config.query_timeout
+                    )
+                    if name == "add_many_xp":
+                        # grants from the last run were never counted by this process's buffer
+                        self.xp.replayed(*args, rows, own=not self.journal.carried)
+                    # one at a time, so a failure further along doesn't replay this one again
+                    await self.journal.commit()
+            # a key is only needed until its entry is committed. other shards may still be
+            # replaying their own journals, so theirs are kept for a day
+            await wait_for(
+                self.backend.fetch("forget_writes", now - 86400), self.config.query_timeout
+            )
+
+    async def _guard(self, call: Callable[[], Awaitable[T]], timeout: Optional[float]) -> T:
+        # every query goes through here: rejected while degraded, bounded by a timeout otherwise
+        self.breaker.check()
+        try:
+            result = await wait_for(call(), timeout)
+        except CONNECTION_ERRORS as e:
+            if self.breaker.record_failure():
+                logger.error(f"database failing ({e!r}), switching to degraded mode")
+                self.trip()
+            raise DatabaseUnavailable(repr(e)) from e
+        self.breaker.record_success()
+        return result
+
+    async def _run(self, method: str, name: str, *args: Any, scope: Optional[Hashable] = None) -> Any:
+        replica = self._use_replica(name, scope)
+        with self.query_latency[name].time():
+            return await self._guard(
+                lambda: getattr(self.backend, method)(name, *args, replica=replica),
+                self.config.query_timeout,
+            )
+
+    async def fetch(self, name: str, *args: Any, scope: Optional[Hashable] = None) -> list[Record]:
+        """runs the named query `name` and returns all rows.
+
+        reads in REPLICA_QUERIES go to a replica unless `scope` was pinned by a recent write.
+        """
+        return await self._run("fetch", name, *args, scope=scope)
+
+    async def fetchrow(
+        self, name: str, *args: Any, scope: Optional[Hashable] = None
+    ) -> Optional[Record]:
+        """runs the named query `name` and returns the first row."""
+        return await self._run("fetchrow", name, *args, scope=scope)
+
+    async def fetchval(self, name: str, *args: Any, scope: Optional[Hashable] = None) -> Any:
+        """runs the named query `name` and returns the first column of the first row."""
+        return await self._run("fetchval", name, *args, scope=scope)
+
+    async def write(self, method: str, name: str, *args: Any, journal: bool = True) -> Any:
+        """runs a write that may be replayed later, journaling it while the database is down.
+
+        only writes that were never sent are journaled. one that timed out may have run
+        anyway, so it fails with DatabaseUnavailable instead of risking it running twice.
+        journaled writes run exactly once, see `Backend.run_once`.
+
+        Args:
+            journal (bool, optional): set to False when the write can't be trusted while
+                degraded, to fail with CircuitOpen instead. Defaults to True.
+
+        Returns:
+            Any: what the query returned, or None if it was journaled.
+        """
+        try:
+            return await self._run(method, name, *args)
+        except CircuitOpen:
+            if not journal:
+                raise
+            await self.journal.append(name, *args)
+            return None
+
+    def query_stats(self) -> dict[str, dict[str, float]]:
+        """call counts and latency percentiles per query."""
+        return {name: tracker.summary() for name, tracker in self.query_latency.items()}
+
+    def stats(self) -> dict[str, Any]:
+        """the backend's pool usage per role (primary/replica) and every cache and buffer on top of it."""
+        return {
+            "backend": self.backend.stats(),
+            "pinned_scopes": len(self._pinned),
+            "settings_cache": self.settings_cache.stats(),
+            "xp": self.xp.stats(),
+            "leaderboard": self.leaderboard.stats(),
+            "compaction": self.compactor.stats(),
+            "breaker": self.breaker.stats(),
+            "journal": self.journal.stats(),
+        }
+
+    async def create_warn(self, user_id: int, guild: int, reason: str) -> Warn:
+        # the id is None if the warn was journaled during an outage
+        id = await self.write(
+            "fetchval",
+            "create_warn",
+            user_id,
+            reason,
+            (timestamp := int(datetime.now().timestamp())),
+            guild,
+        )
+        self.pin(("warns", guild))
+        return Warn(user_id, reason, timestamp, guild, id)
+
+    async def get_warns(self, user_id: int, guild: int, archived: bool = False) -> list[Warn]:
+        """a user's warns. only recent ones unless `archived` is set, see WarnCompactor."""
+        data = await self.fetch(
+            "get_all_warns" if archived else "get_warns", user_id, guild, scope=("warns", guild)
+        )
+        return [Warn.from_record(warn) for warn in data]
+
+    async def get_warns_page(
+        self,
+        user_id: int,
+        guild: int,
+        limit: int = 10,
+        before: Optional[tuple[int, int]] = None,
+        archived: bool = False,
+    ) -> list[Warn]:
+        """a page of a user's warns, newest first.
+
+        pages are found by position (keyset) instead of OFFSET, so every page costs the same no
+        matter how deep into the history it is.
+
+        Args:
+            user_id (int): the warned user.
+            guild (int): the guild the warns are from.
+            limit (int, optional): the page size. Defaults to 10.
+            before (Optional[tuple[int, int]], optional): the (time, id) of the last warn of the
+                previous page, or None for the first page. Defaults to None.
+            archived (bool, optional): include archived warns. Defaults to False.
+
+        Returns:
+            list[Warn]: at most `limit` warns.
+        """
+        before_time, before_id = before or (WARN_CURSOR_START, WARN_CURSOR_START)
+        data = await self.fetch(
+            "get_all_warns_page" if archived else "get_warns_page",
+            user_id,
+            guild,
+            before_time,
+            before_id,
+            limit,
+            scope=("warns", guild),
+        )
+        return [Warn.from_record(warn) for warn in data]
+
+    async def count_warns(self, user_id: int, guild: int, archived: bool = False) -> int:
+        return await self.fetchval(
+            "count_all_warns" if archived else "count_warns", user_id, guild, scope=("warns", guild)
+        )
+
+    async def export_warns(self, guild: int, chunk_size: int = 500) -> AsyncIterator[Warn]:
+        """yields every warn of a guild, archived ones included, grouped by user and newest first.
+
+        rows are read `chunk_size` at a time. the export as a whole may take as long as it
+        needs, but every chunk has to arrive within the query timeout.
+        """
+        replica = self._use_replica("export_warns", ("warns", guild))
+        chunks = self.backend.stream("export_warns", guild, chunk_size=chunk_size, replica=replica)
+        try:
+            while True:
+                try:
+                    rows = await self._guard(chunks.__anext__, self.config.query_timeout)
+                except StopAsyncIteration:
+                    return
+                for row in rows:
+                    yield Warn.from_record(row)
+        finally:
+            # gives the connection back if the caller stopped early or a chunk failed
+            await chunks.aclose()
+
+    async def delete_warns(self, user_id: int, guild: int) -> int:
+        """deletes every warn of a user, archived ones included, and returns how many there were."""
+        deleted = await self.fetchval("delete_warns", user_id, guild)
+        self.pin(("warns", guild))
+        return deleted
+
+    async def delete_warns_by_id(
+        self, guild: int, ids: Iterable[int], user_id: Optional[int] = None
+    ) -> int:
+        """deletes the given warns of a guild in one statement.
+
+        ids from other guilds, or of other users if `user_id` is given, are ignored.
+
+        Returns:
+            int: how many warns were deleted.
+        """
+        deleted = await self.fetchval("delete_warns_by_id", guild, list(ids), user_id)
+        self.pin(("warns", guild))
+        return deleted
+
+    async def delete_warns_before(self, guild: int, cutoff: float) -> int:
+        """deletes every warn of a guild given before the `cutoff` timestamp.
+
+        Returns:
+            int: how many warns were deleted.
+        """
+        deleted = await self.fetchval("delete_warns_before", guild, int(cutoff))
+        self.pin(("warns", guild))
+        return deleted
+
+    async def import_warns(self, warns: Iterable[Warn]) -> int:
+        """inserts many warns in a single round trip, e.g. when moving over from another bot.
+
+        ids are always assigned by the database, any `id` on the given warns is ignored.
+
+        Returns:
+            int: how many warns were inserted.
+        """
+        guilds: set[int] = set()
+
+        def records():
+            for warn in warns:
+                guilds.add(warn.guild)
+                yield (warn.user_id, warn.reason, int(warn.time), warn.guild)
+
+        with self.query_latency["import_warns"].time():
+            # no timeout, a big import is allowed to take a while
+            imported = await self._guard(
+                lambda: self.backend.copy("warns", WARN_COPY_COLUMNS, records()), None
+            )
+        for guild in guilds:
+            self.pin(("warns", guild))
+        return imported
+
+    async def get_guild_settings(self, guild_id: int) -> Optional[GuildSettings]:
+        if settings := self.settings_cache.get(guild_id):
+            return settings
+        if self._warming and not self._warming.done():
+            # the guild is most likely part of the bulk load, wait for it instead of querying alone
+            try:
+                await wait_for(shield(self._warming), self.config.query_timeout)
+            except (TimeoutError, DatabaseUnavailable):
+                pass
+            if settings := self.settings_cache.get(guild_id):
+                return settings
+        try:
+            data = await self.fetchrow(
+                "get_guild_settings", guild_id, scope=("settings", guild_id)
+            )
+            if data:
+                settings = GuildSettings.from_record(data)
+            else:
+                await self.fetch("create_guild_settings", guild_id)
+                self.pin(("settings", guild_id))
+                settings = GuildSettings(guild_id)
+        except DatabaseUnavailable:
+            # every message waits on this, so answer right away with the last settings we saw.
+            # a guild we know nothing about gets the defaults, which aren't cached
+            return self.settings_cache.get_stale(guild_id) or GuildSettings(guild_id)
+        self.settings_cache.put(settings)
+        return settings
+
+    def prewarm_guild_settings(
+        self, guild_ids: list[int], chunk_size: int = 5000
+    ) -> Task[tuple[int, int, float]]:
+        """starts loading the settings of many guilds into the cache at once.
+
+        reads that miss the cache while this runs wait for it instead of querying on their own.
+
+        Args:
+            guild_ids (list[int]): the guilds to load, only as many as fit in the cache are used.
+            chunk_size (int, optional): guilds per query. Defaults to 5000.
+
+        Returns:
+            Task[tuple[int, int, float]]: resolves to the rows loaded, the rows inserted and the seconds it took.
+        """
+        self._warming = create_task(
+            self._prewarm(guild_ids[: self.config.settings_cache_size], chunk_size)
+        )
+        return self._warming
+
+    async def _prewarm(self, guild_ids: list[int], chunk_size: int) -> tuple[int, int, float]:
+        started = perf_counter()
+        loaded = inserted = 0
+        for start in range(0, len(guild_ids), chunk_size):
+            chunk = guild_ids[start : start + chunk_size]
+            rows = await self.fetch("get_many_guild_settings", chunk)
+            for row in rows:
+                self.settings_cache.put(GuildSettings.from_record(row))
+            loaded += len(rows)
+
+            found = {row["guild_id"] for row in rows}
+            if missing := [guild_id for guild_id in chunk if guild_id not in found]:
+                # one statement for every guild that has never been configured
+                await self.fetch("create_many_guild_settings", missing)
+                for guild_id in missing:
+                    self.settings_cache.put(GuildSettings(guild_id))
+                inserted += len(missing)
+        return loaded, inserted, perf_counter() - started
+
+    def invalidate_guild_settings(self, guild_id: int) -> None:
+        """drops a guild's cached settings, e.g. after they were changed outside of this process."""
+        self.settings_cache.invalidate(guild_id)
+        # the change is probably recent, don't reload it from a replica that hasn't seen it yet
+        self.pin(("settings", guild_id))
+
+    async def set_guild_settings(self, guild_id: int, settings: GuildSettings) -> None:
+        """stores the whole settings row of a guild.
+
+        while degraded, settings are only changed if they're based on the real row. a guild
+        this process never loaded only gets defaults, and replaying those would wipe the rest
+        of the row, so that fails with CircuitOpen instead.
+        """
+        await self.write(
+            "fetch",
+            "set_guild_settings",
+            guild_id,
+            settings.ai_reports_channel,
+            settings.logs_channel,
+            settings.leveling_enabled,
+            settings.ai_ignored_channels,
+            settings.ai_ignored_roles,
+            settings.ai_digest,
+            settings.warn_retention_days,
+            journal=self.settings_cache.known(guild_id),
+        )
+        # write-through, so the next read sees exactly what was just stored. the pin covers
+        # reads that miss the cache anyway, e.g. after an eviction
+        self.settings_cache.put(settings)
+        self.pin(("settings", guild_id))
+    
+    async def get_xp(self, user_id: int) -> int:
+        return await self.xp.get(user_id)
+    
+    async def add_xp(self, user_id: int, xp: int) -> Optional[int]:
+        # buffered, written in batches by the XpBuffer. None if the new total can't be read
+        return await self.xp.add(user_id, xp)
+
+    async def set_xp(self, user_id: int, xp: int) -> int:
+        await self.xp.set(user_id, xp)
+        return xp
+
+
+class GuildSettings(MsgPackMixin):
+    __slots__ = (
+        "guild_id",
+        "ai_reports_channel",
+        "logs_channel",
+        "leveling_enabled",
+        "ai_ignored_channels",
+        "ai_ignored_roles",
+        "ai_digest",
+        "warn_retention_days",
+    )
+
+    # settings are shared through the cache, so they're read-only. use replace() to change them.
+    guild_id: int
+    ai_reports_channel: Optional[int]
+    logs_channel: Optional[int]
+    leveling_enabled: bool
+    # channels and roles AI moderation never scans
+    ai_ignored_channels: tuple[int, ...]
+    ai_ignored_roles: tuple[int, ...]
+    # send AI reports in batched digests instead of one message each
+    ai_digest: bool
+    # warns older than this many days are deleted, None keeps them forever
+    warn_retention_days: Optional[int]
+
+    def __init__(
+        self,
+        guild_id: int,
+        ai_reports_channel: Optional[int] = None,
+        logs_channel: Optional[int] = None,
+        leveling_enabled: bool = False,
+        ai_ignored_channels: Optional[Iterable[int]] = None,
+        ai_ignored_roles: Optional[Iterable[int]] = None,
+        ai_digest: bool = False,
+        warn_retention_days: Optional[int] = None,
+        **kwargs,  # just collapse extra data instead of screaming and crying
+    ):
+        set_attr = super().__setattr__
+        set_attr("guild_id", guild_id)
+        set_attr("ai_reports_channel", ai_reports_channel)
+        set_attr("logs_channel", logs_channel)
+        set_attr("leveling_enabled", leveling_enabled)
+        set_attr("ai_ignored_channels", tuple(ai_ignored_channels or ()))
+        set_attr("ai_ignored_roles", tuple(ai_ignored_roles or ()))
+        set_attr("ai_digest", ai_digest)
+        set_attr("warn_retention_days", warn_retention_days)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("GuildSettings is read-only, use replace() instead.")
+
+    def replace(self, **changes: Any) -> GuildSettings:
+        """returns a copy of these settings with the given fields changed."""
+        return GuildSettings(**{**self.as_dict(), **changes})
+
+    def __repr__(self):
+        return f"<GuildSettings(guild_id={self.guild_id})>"
+
+
+class Warn(MsgPackMixin):
+    __slots__ = ("user_id", "reason", "time", "guild", "id")
+
+    def __init__(self, user_id: int, reason: str, time: float, guild: int, id: Optional[int] = None):
+        self.user_id: int = user_id
+        self.reason: str = reason
+        self.time: float = time
+        self.guild: int = guild
+        self.id: Optional[int] = id
+
+    def __repr__(self):
+        return f"<Warn(user_id={self.user_id}, reason={self.reason}, time={self.time}, guild={self.guild})>"
+
+class Leveling(MsgPackMixin):
+    __slots__ = ("user_id", "xp")
+
+    def __init__(self, user_id: int, xp: int):
+        self.user_id: int = user_id
+        self.xp: int = xp
+
+
+    def __repr__(self):
+        return f"<Leveling(user_id={self.user_id}, xp={self.xp})>"
\ No newline at end of file
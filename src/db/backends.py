@@ -0,0 +1,491 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from itertools import count
+from typing import Any, AsyncGenerator, Callable, Iterable, Optional
+
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncpg import (  # type: ignore
+    InterfaceError,
+    OperatorInterventionError,
+    Pool,
+    PostgresConnectionError,
+    Record,
+)
+
+
+# a row as the Database sees it: columns are read by name, like an asyncpg Record
+Row = Any
+
+
+class Backend(ABC):
+    """where the Database sends its queries.
+
+    a backend runs the named queries from `src.db.queries.QUERIES` and returns rows that can be
+    read by column name. everything above it (caches, the XP buffer, the leaderboard) is shared,
+    so every backend behaves the same from the bot's point of view.
+    """
+
+    __slots__ = ()
+
+    name: str
+
+    # `replica=True` marks a read that may be answered by a read replica, which can lag a
+    # little behind. backends without replicas ignore it
+
+    @abstractmethod
+    async def fetch(self, name: str, *args: Any, replica: bool = False) -> list[Row]:
+        """runs the query `name` and returns all rows."""
+
+    async def fetchrow(self, name: str, *args: Any, replica: bool = False) -> Optional[Row]:
+        """runs the query `name` and returns the first row."""
+        rows = await self.fetch(name, *args, replica=replica)
+        return rows[0] if rows else None
+
+    async def fetchval(self, name: str, *args: Any, replica: bool = False) -> Any:
+        """runs the query `name` and returns the first column of the first row."""
+        row = await self.fetchrow(name, *args, replica=replica)
+        return row[0] if row is not None else None
+
+    @abstractmethod
+    def stream(
+        self, name: str, *args: Any, chunk_size: int = 500, replica: bool = False
+    ) -> AsyncGenerator[list[Row], None]:
+        """runs the query `name` and yields its rows `chunk_size` at a time, without holding all of them in memory."""
+
+    @abstractmethod
+    async def copy(self, table: str, columns: tuple[str, ...], records: Iterable[tuple]) -> int:
+        """inserts many rows into `table` at once and returns how many were inserted."""
+
+    @abstractmethod
+    async def run_once(self, key: str, time: int, name: str, *args: Any) -> Optional[list[Row]]:
+        """runs the query `name` unless a query with the same `key` already ran.
+
+        the key is claimed in the same transaction as the query, so it's recorded if and only
+        if the query ran. `time` is when the key was claimed, see the `forget_writes` query.
+
+        Returns:
+            Optional[list[Row]]: the rows, or None if the key was claimed before.
+        """
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name}
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+
+# errors that mean the server can't be reached or is going away, rather than a bad query. a
+# replica failing with one is skipped for the primary instead of failing the read
+CONNECTION_ERRORS = (
+    OSError,
+    AsyncioTimeoutError,
+    PostgresConnectionError,
+    InterfaceError,
+    OperatorInterventionError,
+)
+
+
+class PostgresBackend(Backend):
+    """runs queries on asyncpg pools whose connections carry prepared statements, see `prepare_statements`.
+
+    writes and exact reads go to the primary `pool`. reads marked `replica=True` go to
+    `replica_pool` if there is one, and fall back to the primary if the replica is unreachable.
+    """
+
+    __slots__ = ("pool", "replica_pool", "queries", "fallbacks")
+
+    name = "postgres"
+
+    def __init__(self, pool: Pool, replica_pool: Optional[Pool] = None):
+        self.pool = pool
+        self.replica_pool = replica_pool
+        # queries run per role
+        self.queries: dict[str, int] = {"primary": 0, "replica": 0}
+        self.fallbacks: int = 0
+
+    async def _query(self, pool: Pool, role: str, method: str, name: str, *args: Any) -> Any:
+        self.queries[role] += 1
+        # single statements are atomic on their own, so there's no transaction around them
+        async with pool.acquire() as conn:
+            return await getattr(conn.statements[name], method)(*args)
+
+    async def _run(self, method: str, name: str, *args: Any, replica: bool = False) -> Any:
+        if replica and self.replica_pool:
+            try:
+                return await self._query(self.replica_pool, "replica", method, name, *args)
+            except CONNECTION_ERRORS:
+                self.fallbacks += 1
+        return await self._query(self.pool, "primary", method, name, *args)
+
+    async def fetch(self, name: str, *args: Any, replica: bool = False) -> list[Record]:
+        return await self._run("fetch", name, *args, replica=replica)
+
+    async def fetchrow(self, name: str, *args: Any, replica: bool = False) -> Optional[Record]:
+        return await self._run("fetchrow", name, *args, replica=replica)
+
+    async def fetchval(self, name: str, *args: Any, replica: bool = False) -> Any:
+        return await self._run("fetchval", name, *args, replica=replica)
+
+    async def stream(
+        self, name: str, *args: Any, chunk_size: int = 500, replica: bool = False
+    ) -> AsyncGenerator[list[Record], None]:
+        pool, role = self.pool, "primary"
+        if replica and self.replica_pool:
+            pool, role = self.replica_pool, "replica"
+        try:
+            conn = await pool.acquire()
+        except CONNECTION_ERRORS:
+            if pool is self.pool:
+                raise
+            self.fallbacks += 1
+            pool, role = self.pool, "primary"
+            conn = await pool.acquire()
+        self.queries[role] += 1
+        # cursors only live inside a transaction, and the connection is held until the caller is done
+        try:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.statements[name].cursor(*args)
+                while rows := await cursor.fetch(chunk_size):
+                    yield rows
+        finally:
+            await pool.release(conn)
+
+    async def copy(self, table: str, columns: tuple[str, ...], records: Iterable[tuple]) -> int:
+        # COPY streams every record in one round trip instead of one INSERT per row
+        async with self.pool.acquire() as conn:
+            status = await conn.copy_records_to_table(table, records=records, columns=columns)
+        return int(status.split()[-1])
+
+    async def run_once(self, key: str, time: int, name: str, *args: Any) -> Optional[list[Record]]:
+        self.queries["primary"] += 1
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if not await conn.statements["claim_write"].fetchval(key, time):
+                    return None
+                return await conn.statements[name].fetch(*args)
+
+    async def close(self) -> None:
+        if self.replica_pool:
+            await self.replica_pool.close()
+        await self.pool.close()
+
+    def stats(self) -> dict[str, Any]:
+        pools = {"primary": self.pool, "replica": self.replica_pool}
+        return {
+            "backend": self.name,
+            "fallbacks": self.fallbacks,
+            **{
+                role: {
+                    "size": pool.get_size(),
+                    "idle": pool.get_idle_size(),
+                    "in_use": pool.get_size() - pool.get_idle_size(),
+                    "max": pool.get_max_size(),
+                    "queries": self.queries[role],
+                }
+                for role, pool in pools.items()
+                if pool
+            },
+        }
+
+
+class MemoryRow(dict):
+    """a dict that can also be read by column position, like an asyncpg Record."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return super().__getitem__(key)
+
+
+class MemoryBackend(Backend):
+    """keeps every table in process memory. meant for tests, benchmarks and load tests.
+
+    each query in QUERIES has a python twin here with the same results, including the
+    column names and defaults of the real schema. nothing survives a restart.
+    """
+
+    __slots__ = (
+        "warns",
+        "warns_archive",
+        "guild_config",
+        "leveling",
+        "replayed_writes",
+        "_warn_ids",
+        "_queries",
+    )
+
+    name = "memory"
+
+    def __init__(self):
+        # warn id -> row, recent and archived
+        self.warns: dict[int, dict[str, Any]] = {}
+        self.warns_archive: dict[int, dict[str, Any]] = {}
+        # guild id -> row
+        self.guild_config: dict[int, dict[str, Any]] = {}
+        # user id -> xp
+        self.leveling: dict[int, int] = {}
+        # write key -> time it was claimed
+        self.replayed_writes: dict[str, int] = {}
+        self._warn_ids = count(1)
+        self._queries: dict[str, Callable[..., list[MemoryRow]]] = {
+            "ping": lambda: [MemoryRow(ping=1)],
+            "create_warn": self._create_warn,
+            "get_warns": lambda user_id, guild: self._user_warns(user_id, guild, False),
+            "get_all_warns": lambda user_id, guild: self._user_warns(user_id, guild, True),
+            "get_warns_page": lambda user_id, guild, *page: self._page(
+                self._user_warns(user_id, guild, False), *page
+            ),
+            "get_all_warns_page": lambda user_id, guild, *page: self._page(
+                self._user_warns(user_id, guild, True), *page
+            ),
+            "count_warns": lambda user_id, guild: [
+                MemoryRow(count=len(self._user_warns(user_id, guild, False)))
+            ],
+            "count_all_warns": lambda user_id, guild: [
+                MemoryRow(count=len(self._user_warns(user_id, guild, True)))
+            ],
+            "export_warns": self._export_warns,
+            "delete_warns": lambda user_id, guild: self._delete_where(
+                lambda warn: warn["user_id"] == user_id and warn["guild"] == guild
+            ),
+            "delete_warns_by_id": self._delete_warns_by_id,
+            "delete_warns_before": lambda guild, cutoff: self._delete_where(
+                lambda warn: warn["guild"] == guild and warn["time"] < cutoff
+            ),
+            "archive_warns": self._archive_warns,
+            "expire_warns": lambda now, limit: self._delete_where(
+                self._expired(now), (self.warns,), limit
+            ),
+            "expire_archived_warns": lambda now, limit: self._delete_where(
+                self._expired(now), (self.warns_archive,), limit
+            ),
+            "get_guild_settings": self._get_guild_settings,
+            "get_many_guild_settings": self._get_many_guild_settings,
+            "create_guild_settings": self._create_guild_settings,
+            "create_many_guild_settings": self._create_many_guild_settings,
+            "set_guild_settings": self._set_guild_settings,
+            "get_xp": self._get_xp,
+            "add_many_xp": self._add_many_xp,
+            "set_xp": self._set_xp,
+            "top_xp": self._top_xp,
+            "xp_rank": self._xp_rank,
+            "claim_write": self._claim_write,
+            "forget_writes": self._forget_writes,
+        }
+
+    async def fetch(self, name: str, *args: Any, replica: bool = False) -> list[MemoryRow]:
+        # there is no await in between, so every query is atomic like a single statement
+        return self._queries[name](*args)
+
+    async def stream(
+        self, name: str, *args: Any, chunk_size: int = 500, replica: bool = False
+    ) -> AsyncGenerator[list[MemoryRow], None]:
+        rows = self._queries[name](*args)
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start : start + chunk_size]
+
+    async def copy(self, table: str, columns: tuple[str, ...], records: Iterable[tuple]) -> int:
+        if table != "warns":
+            raise ValueError(f"the memory backend can't copy into {table}.")
+        inserted = 0
+        for record in records:
+            values = dict(zip(columns, record))
+            self._create_warn(values["user_id"], values["reason"], values["time"], values["guild"])
+            inserted += 1
+        return inserted
+
+    async def run_once(self, key: str, time: int, name: str, *args: Any) -> Optional[list[MemoryRow]]:
+        if not self._claim_write(key, time):
+            return None
+        return self._queries[name](*args)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "warns": len(self.warns),
+            "warns_archive": len(self.warns_archive),
+            "guild_config": len(self.guild_config),
+            "leveling": len(self.leveling),
+        }
+
+    # warns
+
+    def _create_warn(self, user_id: int, reason: str, time: int, guild: int) -> list[MemoryRow]:
+        id = next(self._warn_ids)
+        self.warns[id] = {"id": id, "user_id": user_id, "reason": reason, "time": time, "guild": guild}
+        return [MemoryRow(id=id)]
+
+    def _tables(self, archive: bool) -> tuple[dict[int, dict[str, Any]], ...]:
+        return (self.warns, self.warns_archive) if archive else (self.warns,)
+
+    def _user_warns(self, user_id: int, guild: int, archive: bool) -> list[MemoryRow]:
+        return [
+            MemoryRow(warn)
+            for table in self._tables(archive)
+            for warn in table.values()
+            if warn["user_id"] == user_id and warn["guild"] == guild
+        ]
+
+    def _page(
+        self, warns: list[MemoryRow], before_time: int, before_id: int, limit: int
+    ) -> list[MemoryRow]:
+        warns = [warn for warn in warns if (warn["time"], warn["id"]) < (before_time, before_id)]
+        warns.sort(key=lambda warn: (warn["time"], warn["id"]), reverse=True)
+        return warns[:limit]
+
+    def _export_warns(self, guild: int) -> list[MemoryRow]:
+        warns = [
+            MemoryRow(warn)
+            for table in self._tables(True)
+            for warn in table.values()
+            if warn["guild"] == guild
+        ]
+        warns.sort(key=lambda warn: (warn["user_id"], -warn["time"], -warn["id"]))
+        return warns
+
+    def _delete_where(
+        self,
+        matches: Callable[[dict[str, Any]], bool],
+        tables: Optional[tuple[dict[int, dict[str, Any]], ...]] = None,
+        limit: Optional[int] = None,
+    ) -> list[MemoryRow]:
+        deleted = 0
+        for table in tables or self._tables(True):
+            ids = [id for id, warn in table.items() if matches(warn)][: limit]
+            for id in ids:
+                del table[id]
+            deleted += len(ids)
+        return [MemoryRow(count=deleted)]
+
+    def _delete_warns_by_id(
+        self, guild: int, ids: list[int], user_id: Optional[int]
+    ) -> list[MemoryRow]:
+        wanted = set(ids)
+        return self._delete_where(
+            lambda warn: warn["guild"] == guild
+            and warn["id"] in wanted
+            and (user_id is None or warn["user_id"] == user_id)
+        )
+
+    def _archive_warns(self, cutoff: int, limit: int) -> list[MemoryRow]:
+        moved = sorted(
+            (warn for warn in self.warns.values() if warn["time"] < cutoff),
+            key=lambda warn: warn["time"],
+        )[:limit]
+        for warn in moved:
+            self.warns_archive[warn["id"]] = self.warns.pop(warn["id"])
+        return [MemoryRow(count=len(moved))]
+
+    def _expired(self, now: int) -> Callable[[dict[str, Any]], bool]:
+        def expired(warn: dict[str, Any]) -> bool:
+            config = self.guild_config.get(warn["guild"])
+            days = config and config["warn_retention_days"]
+            return days is not None and warn["time"] < now - days * 86400
+
+        return expired
+
+    # guild_config
+
+    def _settings_row(self, guild_id: int) -> MemoryRow:
+        row = self.guild_config[guild_id]
+        return MemoryRow(
+            row,
+            ai_ignored_channels=list(row["ai_ignored_channels"]),
+            ai_ignored_roles=list(row["ai_ignored_roles"]),
+        )
+
+    def _get_guild_settings(self, guild_id: int) -> list[MemoryRow]:
+        return [self._settings_row(guild_id)] if guild_id in self.guild_config else []
+
+    def _get_many_guild_settings(self, guild_ids: list[int]) -> list[MemoryRow]:
+        return [self._settings_row(guild_id) for guild_id in guild_ids if guild_id in self.guild_config]
+
+    def _create_guild_settings(self, guild_id: int) -> list[MemoryRow]:
+        # same defaults as the guild_config columns
+        self.guild_config.setdefault(
+            guild_id,
+            {
+                "guild_id": guild_id,
+                "ai_reports_channel": None,
+                "logs_channel": None,
+                "leveling_enabled": False,
+                "ai_ignored_channels": [],
+                "ai_ignored_roles": [],
+                "ai_digest": False,
+                "warn_retention_days": None,
+            },
+        )
+        return []
+
+    def _create_many_guild_settings(self, guild_ids: list[int]) -> list[MemoryRow]:
+        for guild_id in guild_ids:
+            self._create_guild_settings(guild_id)
+        return []
+
+    def _set_guild_settings(
+        self,
+        guild_id: int,
+        ai_reports_channel: Optional[int],
+        logs_channel: Optional[int],
+        leveling_enabled: bool,
+        ai_ignored_channels: list[int],
+        ai_ignored_roles: list[int],
+        ai_digest: bool,
+        warn_retention_days: Optional[int],
+    ) -> list[MemoryRow]:
+        self.guild_config[guild_id] = {
+            "guild_id": guild_id,
+            "ai_reports_channel": ai_reports_channel,
+            "logs_channel": logs_channel,
+            "leveling_enabled": leveling_enabled,
+            "ai_ignored_channels": list(ai_ignored_channels),
+            "ai_ignored_roles": list(ai_ignored_roles),
+            "ai_digest": ai_digest,
+            "warn_retention_days": warn_retention_days,
+        }
+        return []
+
+    # leveling
+
+    def _get_xp(self, user_id: int) -> list[MemoryRow]:
+        return [MemoryRow(xp=self.leveling[user_id])] if user_id in self.leveling else []
+
+    def _add_many_xp(self, user_ids: list[int], xps: list[int]) -> list[MemoryRow]:
+        rows = []
+        for user_id, xp in zip(user_ids, xps):
+            total = self.leveling[user_id] = self.leveling.get(user_id, 0) + xp
+            rows.append(MemoryRow(user_id=user_id, xp=total))
+        return rows
+
+    def _set_xp(self, user_id: int, xp: int) -> list[MemoryRow]:
+        self.leveling[user_id] = xp
+        return []
+
+    def _top_xp(self, limit: int) -> list[MemoryRow]:
+        ranked = sorted(self.leveling.items(), key=lambda item: (-item[1], item[0]))
+        return [MemoryRow(user_id=user_id, xp=xp) for user_id, xp in ranked[:limit]]
+
+    def _xp_rank(self, xp: int) -> list[MemoryRow]:
+        return [MemoryRow(rank=sum(1 for other in self.leveling.values() if other > xp) + 1)]
+
+    # replayed_writes
+
+    def _claim_write(self, key: str, time: int) -> list[MemoryRow]:
+        if key in self.replayed_writes:
+            return []
+        self.replayed_writes[key] = time
+        return [MemoryRow(claimed=True)]
+
+    def _forget_writes(self, cutoff: int) -> list[MemoryRow]:
+        self.replayed_writes = {
+            key: time for key, time in self.replayed_writes.items() if time >= cutoff
+        }
+        return []
+
+
+BACKENDS = ("postgres", "memory")
@@ -0,0 +1,102 @@
+"""microbenchmark for the database model codecs.
+
+compares the slot-driven codecs of GuildSettings, Warn and Leveling against the old
+reflection-based ones, which walked `dir()` and packed dicts keyed by attribute name.
+
+    python -m src.db.bench --number 100000
+"""
+from __future__ import annotations
+from argparse import ArgumentParser
+from time import time
+from timeit import timeit
+from typing import Any, Callable, Optional
+
+from msgpack import packb, unpackb  # type: ignore
+
+from src.db import GuildSettings, Leveling, MsgPackMixin, Warn
+
+
+def legacy_as_dict(obj: Any) -> dict[str, Any]:
+    # the old mixin skipped dunders only. the new private codec attributes are skipped too so
+    # both sides produce the same fields
+    return {
+        attr: getattr(obj, attr)
+        for attr in dir(obj)
+        if not attr.startswith("_") and not callable(getattr(obj, attr))
+    }
+
+
+def legacy_serialize(obj: Any) -> bytes:
+    return packb(legacy_as_dict(obj))
+
+
+def legacy_from_data(cls: type, data: bytes) -> Any:
+    return cls(**unpackb(data))
+
+
+def legacy_from_record(cls: type, record: dict[str, Any]) -> Any:
+    # what the query layer did with asyncpg rows before: copy into a dict, then pack and unpack it
+    return legacy_from_data(cls, packb({k: v for k, v in record.items()}))
+
+
+def samples() -> list[MsgPackMixin]:
+    return [
+        GuildSettings(123456789012345678, 223456789012345678, None, True, (1, 2, 3), (4,), True),
+        Warn(123456789012345678, "spamming in general", int(time()), 223456789012345678, 42),
+        Leveling(123456789012345678, 1337),
+    ]
+
+
+def compare(
+    name: str, old: Callable[[], Any], new: Callable[[], Any], number: int
+) -> tuple[str, float, float]:
+    return name, timeit(old, number=number) / number, timeit(new, number=number) / number
+
+
+def run(number: int) -> list[tuple[str, float, float]]:
+    results: list[tuple[str, float, float]] = []
+    for obj in samples():
+        cls = type(obj)
+        name = cls.__name__
+        legacy_data = packb(obj.as_dict())
+        data = obj.serialize()
+        record = obj.as_dict()
+
+        results.append(
+            compare(f"{name} serialize", lambda: legacy_serialize(obj), obj.serialize, number)
+        )
+        results.append(
+            compare(
+                f"{name} deserialize",
+                lambda: legacy_from_data(cls, legacy_data),
+                lambda: cls.from_data(data),
+                number,
+            )
+        )
+        results.append(
+            compare(
+                f"{name} from record",
+                lambda: legacy_from_record(cls, record),
+                lambda: cls.from_record(record),
+                number,
+            )
+        )
+        results.append((f"{name} payload bytes", len(legacy_data), len(data)))
+    return results
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m src.db.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000, help="iterations per measurement")
+    options = parser.parse_args(args)
+
+    print(f"{'operation':>28} {'old':>10} {'new':>10} {'speedup':>8}")
+    for name, old, new in run(options.number):
+        if name.endswith("bytes"):
+            print(f"{name:>28} {int(old):>10} {int(new):>10} {old / new:>7.2f}x")
+        else:
+            print(f"{name:>28} {old * 1e9:>8.0f}ns {new * 1e9:>8.0f}ns {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
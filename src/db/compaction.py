@@ -0,0 +1,112 @@
+from __future__ import annotations
+from asyncio import Task, create_task, sleep
+from datetime import datetime
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Optional
+
+from src.metrics import LatencyTracker
+
+if TYPE_CHECKING:
+    from src.db import Database
+
+
+logger = getLogger(__name__)
+
+
+class WarnCompactor:
+    """keeps the `warns` table small by moving old warns to `warns_archive` and deleting expired ones.
+
+    warns older than `hot_days` are moved to the archive, which normal lookups never read.
+    warns older than their guild's `warn_retention_days` are deleted from both tables. every
+    statement handles at most `batch_size` rows and there's a `pause` between statements, so
+    locks are only held briefly and the bot's own queries get through in between.
+    """
+
+    __slots__ = (
+        "db",
+        "hot_days",
+        "interval",
+        "batch_size",
+        "pause",
+        "_task",
+        "runs",
+        "archived",
+        "expired",
+        "batch_latency",
+    )
+
+    def __init__(
+        self,
+        db: Database,
+        hot_days: float = 90.0,
+        interval: float = 3600.0,
+        batch_size: int = 1000,
+        pause: float = 0.1,
+    ):
+        self.db = db
+        self.hot_days = hot_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task: Optional[Task[None]] = None
+        self.runs: int = 0
+        self.archived: int = 0
+        self.expired: int = 0
+        self.batch_latency = LatencyTracker()
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"failed to compact warns: {e}")
+            await sleep(self.interval)
+
+    async def _drain(self, name: str, *args: Any) -> int:
+        # repeats a batch statement until it comes back short
+        total = 0
+        while True:
+            with self.batch_latency.time():
+                done = await self.db.fetchval(name, *args, self.batch_size)
+            total += done
+            if done < self.batch_size:
+                return total
+            await sleep(self.pause)
+
+    async def compact(self) -> tuple[int, int]:
+        """runs one full compaction.
+
+        Returns:
+            tuple[int, int]: how many warns were archived and how many were deleted.
+        """
+        now = int(datetime.now().timestamp())
+        # expire first, so warns about to be deleted aren't moved needlessly
+        expired = await self._drain("expire_warns", now)
+        expired += await self._drain("expire_archived_warns", now)
+        archived = await self._drain("archive_warns", now - int(self.hot_days * 86400))
+        self.runs += 1
+        self.archived += archived
+        self.expired += expired
+        if archived or expired:
+            logger.info(f"compacted warns: {archived} archived, {expired} expired")
+        return archived, expired
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "archived": self.archived,
+            "expired": self.expired,
+            **{f"batch_{key}": value for key, value in self.batch_latency.summary().items()},
+        }
+
+    def __repr__(self):
+        return f"<WarnCompactor(hot_days={self.hot_days}, interval={self.interval})>"
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from time import monotonic
+from typing import Any, Optional
+
+
+class DatabaseUnavailable(Exception):
+    """the database didn't answer in time or couldn't be reached. the query may or may not have run."""
+
+
+class CircuitOpen(DatabaseUnavailable):
+    """the database is known to be down, so the query wasn't sent at all."""
+
+
+class CircuitBreaker:
+    """stops sending queries to a database that keeps failing.
+
+    after `threshold` failures in a row the circuit opens and every call is rejected right
+    away with CircuitOpen, instead of waiting for its own timeout. whoever opened it is
+    responsible for probing the database and calling `close()` once it answers again.
+    """
+
+    __slots__ = ("threshold", "failures", "opened_at", "trips", "rejected")
+
+    def __init__(self, threshold: int = 5):
+        self.threshold = threshold
+        # consecutive failures
+        self.failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.trips: int = 0
+        self.rejected: int = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.opened_at is None
+
+    def check(self) -> None:
+        """raises CircuitOpen if calls shouldn't go through right now."""
+        if self.opened_at is not None:
+            self.rejected += 1
+            raise CircuitOpen("the database is unavailable")
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """counts a failed call.
+
+        Returns:
+            bool: whether this failure opened the circuit.
+        """
+        self.failures += 1
+        if self.opened_at is None and self.failures >= self.threshold:
+            self.open()
+            return True
+        return False
+
+    def open(self) -> None:
+        if self.opened_at is None:
+            self.opened_at = monotonic()
+            self.trips += 1
+
+    def close(self) -> None:
+        self.opened_at = None
+        self.failures = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": "closed" if self.closed else "open",
+            "open_for": 0.0 if self.opened_at is None else monotonic() - self.opened_at,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+    def __repr__(self):
+        return f"<CircuitBreaker(state={'closed' if self.closed else 'open'}, trips={self.trips})>"
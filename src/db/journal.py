@@ -0,0 +1,167 @@
+from __future__ import annotations
+from asyncio import Lock, get_running_loop
+from collections import deque
+from itertools import islice
+from logging import getLogger
+from os import fsync, path, replace
+from typing import Any
+from uuid import uuid4
+
+from msgpack import Unpacker, packb  # type: ignore
+
+from src.db.health import CircuitOpen
+
+
+logger = getLogger(__name__)
+
+# a journaled write: a unique key, the named query and its arguments
+Entry = tuple[str, str, list[Any]]
+
+
+class WriteJournal:
+    """writes that couldn't reach the database, kept on disk until they can be replayed.
+
+    every entry is a named query and its arguments, appended to `path` as msgpack and synced
+    before `append` returns, so they survive a crash or restart. entries are replayed in the
+    order they were written and committed one by one as they land: a commit appends a small
+    marker instead of rewriting the file, and the file is only rewritten once the markers pile up.
+
+    an entry that was replayed right before a crash is replayed again after the restart, so
+    every entry carries a unique key the database can use to recognize it, see
+    `Backend.run_once`.
+
+    the journal holds at most `max_entries`. once full, `append` raises CircuitOpen
+    instead of growing without limit.
+    """
+
+    __slots__ = (
+        "path",
+        "max_entries",
+        "_entries",
+        "_markers",
+        "_unwritten",
+        "_lock",
+        "carried",
+        "journaled",
+        "replayed",
+        "rejected",
+    )
+
+    def __init__(self, path: str, max_entries: int = 10_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: deque[Entry] = deque()
+        # commit markers in the file since it was last rewritten
+        self._markers: int = 0
+        # entries at the back that are queued but still waiting to be written to the file
+        self._unwritten: int = 0
+        self._lock = Lock()
+        # entries at the front that were loaded from the last run rather than appended by this one
+        self.carried: int = 0
+        self.journaled: int = 0
+        self.replayed: int = 0
+        self.rejected: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> int:
+        """reads the entries left over from the last run. call once, before anything is appended.
+
+        Returns:
+            int: how many entries were loaded.
+        """
+        if not path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            # a half written entry at the end (a crash mid-append) is simply not yielded
+            for item in Unpacker(f, use_list=True, raw=False):
+                if isinstance(item, int):
+                    # a commit marker, the oldest `item` entries were replayed
+                    for _ in range(min(item, len(self._entries))):
+                        self._entries.popleft()
+                    self._markers += 1
+                else:
+                    key, name, args = item
+                    self._entries.append((key, name, args))
+        # start over from what was read. a torn entry left at the end would otherwise swallow
+        # everything appended after it on the next load
+        self._rewrite(list(self._entries))
+        self._markers = 0
+        self.carried = len(self._entries)
+        return self.carried
+
+    def _write(self, data: bytes) -> None:
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            fsync(f.fileno())
+
+    def _rewrite(self, entries: list[Entry]) -> None:
+        # write a new file and swap it in, so a crash leaves either the old or the new one
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            for entry in entries:
+                f.write(packb(entry))
+            f.flush()
+            fsync(f.fileno())
+        replace(temporary, self.path)
+
+    async def append(self, name: str, *args: Any) -> None:
+        """stores a write for later.
+
+        Raises:
+            CircuitOpen: the journal is full. the write wasn't sent or stored anywhere.
+        """
+        if len(self._entries) >= self.max_entries:
+            self.rejected += 1
+            raise CircuitOpen("the database is unavailable and the write journal is full")
+        # queued right away, so a replay that is running already picks it up
+        entry = (uuid4().hex, name, list(args))
+        self._entries.append(entry)
+        self._unwritten += 1
+        self.journaled += 1
+        # asyncio locks are fair, so entries reach the file in the order they were queued
+        async with self._lock:
+            try:
+                await get_running_loop().run_in_executor(None, self._write, packb(entry))
+            except OSError as e:
+                # still replayed from memory, it just won't survive a restart
+                logger.error(f"failed to write {name} to the journal: {e}")
+            finally:
+                self._unwritten -= 1
+
+    def head(self, count: int) -> list[Entry]:
+        """the oldest `count` entries, the next ones to replay."""
+        return list(islice(self._entries, count))
+
+    async def commit(self, count: int = 1) -> None:
+        """drops the first `count` entries after they were replayed."""
+        for _ in range(count):
+            self._entries.popleft()
+        self.carried = max(self.carried - count, 0)
+        self.replayed += count
+        # after any append that is still writing, so the marker lands behind the entries it covers
+        async with self._lock:
+            loop = get_running_loop()
+            if len(self._entries) == self._unwritten or self._markers >= self.max_entries:
+                # entries still waiting on the lock are written by their own append
+                written = list(islice(self._entries, len(self._entries) - self._unwritten))
+                await loop.run_in_executor(None, self._rewrite, written)
+                self._markers = 0
+            else:
+                await loop.run_in_executor(None, self._write, packb(count))
+                self._markers += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "carried": self.carried,
+            "max_entries": self.max_entries,
+            "journaled": self.journaled,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+        }
+
+    def __repr__(self):
+        return f"<WriteJournal(path={self.path!r}, entries={len(self._entries)})>"
@@ -0,0 +1,100 @@
+from __future__ import annotations
+from asyncio import Task, create_task, sleep
+from bisect import insort
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional
+from cachetools import TTLCache
+
+if TYPE_CHECKING:
+    from src.db import Database
+
+
+logger = getLogger(__name__)
+
+
+class Leaderboard:
+    """answers "top N" and "what rank am I" for XP without sorting the table on every call.
+
+    the top `size` users are kept in memory, refreshed from the `xp` index every `interval`
+    seconds and patched in between whenever the XP buffer writes new totals. ranks below the
+    cached top come from a count over the `xp` index and are cached by XP value for `rank_ttl`
+    seconds (or until the next refresh), so every user with the same XP shares one lookup.
+    they aren't dropped when totals change in between, so they can be that far behind.
+    """
+
+    __slots__ = ("db", "size", "interval", "_top", "_ranks", "_task", "refreshes")
+
+    def __init__(self, db: Database, size: int = 100, interval: float = 60.0, rank_ttl: float = 30.0):
+        self.db = db
+        self.size = size
+        self.interval = interval
+        # (-xp, user_id) pairs, so the list sorts from the highest xp down
+        self._top: list[tuple[int, int]] = []
+        self._ranks: TTLCache[int, int] = TTLCache(maxsize=10_000, ttl=rank_ttl)
+        self._task: Optional[Task[None]] = None
+        self.refreshes: int = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"failed to refresh the leaderboard: {e}")
+            await sleep(self.interval)
+
+    async def refresh(self) -> None:
+        """reloads the cached top from the database."""
+        rows = await self.db.fetch("top_xp", self.size)
+        self._top = [(-row["xp"], row["user_id"]) for row in rows]
+        self._ranks.clear()
+        self.refreshes += 1
+
+    def update(self, rows: Iterable[Mapping[str, int]]) -> None:
+        """patches the cached top with fresh totals, e.g. the ones a flush just wrote."""
+        for row in rows:
+            user_id, xp = row["user_id"], row["xp"]
+            self._top = [entry for entry in self._top if entry[1] != user_id]
+            if len(self._top) < self.size or -xp < self._top[-1][0]:
+                insort(self._top, (-xp, user_id))
+                del self._top[self.size :]
+        # ranks below the top shift a little too, but recounting them after every flush would
+        # mean a count on nearly every lookup. they catch up on expiry or the next refresh
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def top(self, limit: int = 10) -> list[tuple[int, int]]:
+        """the users with the most xp.
+
+        Returns:
+            list[tuple[int, int]]: (user_id, xp) pairs, highest first.
+        """
+        if not self._top and not self.refreshes:
+            await self.refresh()
+        return [(user_id, -negative_xp) for negative_xp, user_id in self._top[:limit]]
+
+    async def rank(self, user_id: int) -> tuple[int, int]:
+        """a user's position on the leaderboard, 1 being the top.
+
+        Returns:
+            tuple[int, int]: the rank and the user's xp.
+        """
+        xp = await self.db.get_xp(user_id)
+        for position, (negative_xp, cached_user) in enumerate(self._top, 1):
+            if cached_user == user_id and -negative_xp == xp:
+                return position, xp
+        if (rank := self._ranks.get(xp)) is None:
+            rank = self._ranks[xp] = await self.db.fetchval("xp_rank", xp)
+        return rank, xp
+
+    def stats(self) -> dict[str, Any]:
+        return {"cached": len(self._top), "cached_ranks": len(self._ranks), "refreshes": self.refreshes}
+
+    def __repr__(self):
+        return f"<Leaderboard(size={self.size}, cached={len(self._top)})>"
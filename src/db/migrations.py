@@ -0,0 +1,147 @@
+from __future__ import annotations
+from logging import getLogger
+from asyncpg import Connection # type: ignore
+
+
+logger = getLogger(__name__)
+
+# any constant works, it only has to be the same for every shard
+MIGRATION_LOCK = 0x676C797068
+
+# (version, name, sql). append new migrations to the end and never edit applied ones.
+# the first two are written to be no-ops on databases created before migrations existed.
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (
+        1,
+        "initial tables",
+        """
+        CREATE TABLE IF NOT EXISTS warns(
+            user_id BIGINT,
+            reason TEXT,
+            time BIGINT,
+            guild BIGINT
+        );
+        CREATE TABLE IF NOT EXISTS leveling(
+            user_id BIGINT,
+            xp BIGINT
+        );
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id BIGINT PRIMARY KEY,
+            ai_reports_channel BIGINT UNIQUE,
+            logs_channel BIGINT UNIQUE,
+            leveling_enabled BOOLEAN DEFAULT FALSE
+        );
+        """,
+    ),
+    (
+        2,
+        "ai moderation settings",
+        """
+        ALTER TABLE guild_config
+            ADD COLUMN IF NOT EXISTS ai_ignored_channels BIGINT[] DEFAULT '{}',
+            ADD COLUMN IF NOT EXISTS ai_ignored_roles BIGINT[] DEFAULT '{}',
+            ADD COLUMN IF NOT EXISTS ai_digest BOOLEAN DEFAULT FALSE;
+        """,
+    ),
+    (
+        3,
+        "leveling primary key",
+        """
+        DELETE FROM leveling WHERE user_id IS NULL;
+        UPDATE leveling SET xp = 0 WHERE xp IS NULL;
+        -- keep the highest xp of any duplicate rows before the key can be added
+        DELETE FROM leveling a USING leveling b
+            WHERE a.user_id = b.user_id AND (a.xp, a.ctid) < (b.xp, b.ctid);
+        ALTER TABLE leveling
+            ALTER COLUMN xp SET DEFAULT 0,
+            ALTER COLUMN xp SET NOT NULL,
+            ADD PRIMARY KEY (user_id);
+        """,
+    ),
+    (
+        4,
+        "warns primary key and lookup index",
+        """
+        ALTER TABLE warns ADD COLUMN id BIGSERIAL PRIMARY KEY;
+        CREATE INDEX warns_guild_user_time_idx ON warns (guild, user_id, time DESC);
+        """,
+    ),
+    (
+        5,
+        "leveling xp index",
+        """
+        CREATE INDEX leveling_xp_idx ON leveling (xp DESC, user_id);
+        """,
+    ),
+    (
+        6,
+        "warns keyset index",
+        """
+        CREATE INDEX warns_guild_user_time_id_idx ON warns (guild, user_id, time DESC, id DESC);
+        DROP INDEX IF EXISTS warns_guild_user_time_idx;
+        """,
+    ),
+    (
+        7,
+        "warns archive and retention",
+        """
+        ALTER TABLE guild_config ADD COLUMN warn_retention_days INTEGER;
+        CREATE TABLE warns_archive (
+            id BIGINT PRIMARY KEY,
+            user_id BIGINT,
+            reason TEXT,
+            time BIGINT,
+            guild BIGINT
+        );
+        CREATE INDEX warns_archive_guild_user_time_id_idx
+            ON warns_archive (guild, user_id, time DESC, id DESC);
+        CREATE INDEX warns_archive_time_idx ON warns_archive (time);
+        CREATE INDEX warns_time_idx ON warns (time);
+        """,
+    ),
+    (
+        8,
+        "replayed journal writes",
+        """
+        CREATE TABLE replayed_writes (
+            key TEXT PRIMARY KEY,
+            time BIGINT NOT NULL
+        );
+        """,
+    ),
+]
+
+
+async def migrate(conn: Connection) -> list[int]:
+    """applies every migration that hasn't been applied yet, each in its own transaction.
+
+    an advisory lock makes concurrently starting shards wait for each other, so only one of
+    them runs the migrations and the rest find nothing left to do.
+
+    Returns:
+        list[int]: the versions that were applied.
+    """
+    applied_now = []
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK)
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+        for version, name, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name
+                )
+            logger.info(f"Applied migration {version}: {name}")
+            applied_now.append(version)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK)
+    return applied_now
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from asyncpg import Connection # type: ignore
+from asyncpg.prepared_stmt import PreparedStatement # type: ignore
+
+
+GUILD_CONFIG_COLUMNS = """guild_id, ai_reports_channel, logs_channel, leveling_enabled,
+    ai_ignored_channels, ai_ignored_roles, ai_digest, warn_retention_days"""
+
+WARN_COLUMNS = "id, user_id, reason, time, guild"
+# recent warns live in `warns`, older ones are moved to `warns_archive` by the WarnCompactor.
+# lookups only read the hot table unless they ask for the archive too
+ALL_WARNS = f"(SELECT {WARN_COLUMNS} FROM warns UNION ALL SELECT {WARN_COLUMNS} FROM warns_archive) AS w"
+
+# every query the Database runs, by name. columns are listed explicitly because a prepared
+# `SELECT *` breaks as soon as a migration adds a column.
+QUERIES: dict[str, str] = {
+    "ping": "SELECT 1",
+    "create_warn": """INSERT INTO warns (user_id, reason, time, guild)
+        VALUES ($1, $2, $3, $4) RETURNING id""",
+    "get_warns": f"""SELECT {WARN_COLUMNS} FROM warns
+        WHERE user_id = $1 AND guild = $2""",
+    "get_all_warns": f"""SELECT {WARN_COLUMNS} FROM {ALL_WARNS}
+        WHERE user_id = $1 AND guild = $2""",
+    # keyset pagination, newest first. `id` breaks ties between warns from the same second
+    "get_warns_page": f"""SELECT {WARN_COLUMNS} FROM warns
+        WHERE user_id = $1 AND guild = $2 AND (time, id) < ($3, $4)
+        ORDER BY time DESC, id DESC LIMIT $5""",
+    "get_all_warns_page": f"""SELECT {WARN_COLUMNS} FROM {ALL_WARNS}
+        WHERE user_id = $1 AND guild = $2 AND (time, id) < ($3, $4)
+        ORDER BY time DESC, id DESC LIMIT $5""",
+    "count_warns": "SELECT count(*) FROM warns WHERE user_id = $1 AND guild = $2",
+    "count_all_warns": f"SELECT count(*) FROM {ALL_WARNS} WHERE user_id = $1 AND guild = $2",
+    # the full log, ordered like the (guild, user_id, time, id) indexes so both tables are
+    # read in index order and merged without a sort
+    "export_warns": f"""SELECT {WARN_COLUMNS} FROM {ALL_WARNS} WHERE guild = $1
+        ORDER BY user_id, time DESC, id DESC""",
+    # deletes cover both tables and return how many rows they removed
+    "delete_warns": """WITH hot AS (
+            DELETE FROM warns WHERE user_id = $1 AND guild = $2 RETURNING 1
+        ), archived AS (
+            DELETE FROM warns_archive WHERE user_id = $1 AND guild = $2 RETURNING 1
+        ) SELECT (SELECT count(*) FROM hot) + (SELECT count(*) FROM archived)""",
+    "delete_warns_by_id": """WITH hot AS (
+            DELETE FROM warns WHERE guild = $1 AND id = ANY($2::bigint[])
+            AND ($3::bigint IS NULL OR user_id = $3) RETURNING 1
+        ), archived AS (
+            DELETE FROM warns_archive WHERE guild = $1 AND id = ANY($2::bigint[])
+            AND ($3::bigint IS NULL OR user_id = $3) RETURNING 1
+        ) SELECT (SELECT count(*) FROM hot) + (SELECT count(*) FROM archived)""",
+    "delete_warns_before": """WITH hot AS (
+            DELETE FROM warns WHERE guild = $1 AND time < $2 RETURNING 1
+        ), archived AS (
+            DELETE FROM warns_archive WHERE guild = $1 AND time < $2 RETURNING 1
+        ) SELECT (SELECT count(*) FROM hot) + (SELECT count(*) FROM archived)""",
+    # compaction, one bounded batch per call. SKIP LOCKED keeps it out of the way of
+    # moderators deleting the same rows, and the batch size bounds how long locks are held
+    "archive_warns": f"""WITH moved AS (
+            DELETE FROM warns WHERE id IN (
+                SELECT id FROM warns WHERE time < $1 ORDER BY time LIMIT $2 FOR UPDATE SKIP LOCKED
+            ) RETURNING {WARN_COLUMNS}
+        ), archived AS (
+            INSERT INTO warns_archive ({WARN_COLUMNS}) SELECT {WARN_COLUMNS} FROM moved
+            RETURNING 1
+        ) SELECT count(*) FROM archived""",
+    # $1 is the current time. guilds without a retention keep their warns forever
+    "expire_warns": """WITH expired AS (
+            DELETE FROM warns WHERE id IN (
+                SELECT w.id FROM warns w JOIN guild_config g ON g.guild_id = w.guild
+                WHERE g.warn_retention_days IS NOT NULL
+                AND w.time < $1 - g.warn_retention_days::bigint * 86400
+                LIMIT $2 FOR UPDATE OF w SKIP LOCKED
+            ) RETURNING 1
+        ) SELECT count(*) FROM expired""",
+    "expire_archived_warns": """WITH expired AS (
+            DELETE FROM warns_archive WHERE id IN (
+                SELECT w.id FROM warns_archive w JOIN guild_config g ON g.guild_id = w.guild
+                WHERE g.warn_retention_days IS NOT NULL
+                AND w.time < $1 - g.warn_retention_days::bigint * 86400
+                LIMIT $2 FOR UPDATE OF w SKIP LOCKED
+            ) RETURNING 1
+        ) SELECT count(*) FROM expired""",
+    "get_guild_settings": f"SELECT {GUILD_CONFIG_COLUMNS} FROM guild_config WHERE guild_id = $1",
+    "get_many_guild_settings": f"""SELECT {GUILD_CONFIG_COLUMNS} FROM guild_config
+        WHERE guild_id = ANY($1::bigint[])""",
+    "create_guild_settings": "INSERT INTO guild_config (guild_id) VALUES ($1) ON CONFLICT DO NOTHING",
+    "create_many_guild_settings": """INSERT INTO guild_config (guild_id)
+        SELECT unnest($1::bigint[]) ON CONFLICT DO NOTHING""",
+    "set_guild_settings": f"""INSERT INTO guild_config ({GUILD_CONFIG_COLUMNS})
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (guild_id) DO UPDATE
+        SET ai_reports_channel = $2, logs_channel = $3, leveling_enabled = $4,
+        ai_ignored_channels = $5, ai_ignored_roles = $6, ai_digest = $7,
+        warn_retention_days = $8""",
+    "get_xp": "SELECT xp FROM leveling WHERE user_id = $1",
+    "add_many_xp": """INSERT INTO leveling (user_id, xp)
+        SELECT * FROM unnest($1::bigint[], $2::bigint[])
+        ON CONFLICT (user_id) DO UPDATE SET xp = leveling.xp + EXCLUDED.xp
+        RETURNING user_id, xp""",
+    "set_xp": """INSERT INTO leveling (user_id, xp) VALUES ($1, $2)
+        ON CONFLICT (user_id) DO UPDATE SET xp = $2""",
+    "top_xp": "SELECT user_id, xp FROM leveling ORDER BY xp DESC, user_id LIMIT $1",
+    "xp_rank": "SELECT count(*) + 1 FROM leveling WHERE xp > $1",
+    # journaled writes claim their key in the same transaction they run in, so a write that is
+    # replayed twice (e.g. after a crash mid-replay) only takes effect once
+    "claim_write": """INSERT INTO replayed_writes (key, time) VALUES ($1, $2)
+        ON CONFLICT DO NOTHING RETURNING true""",
+    "forget_writes": "DELETE FROM replayed_writes WHERE time < $1",
+}
+
+
+# reads that may be answered by a replica, a little behind the primary. get_xp is missing on
+# purpose: the XP buffer adds its pending grants to the stored total, so that has to be exact
+REPLICA_QUERIES: frozenset[str] = frozenset(
+    (
+        "get_warns",
+        "get_all_warns",
+        "get_warns_page",
+        "get_all_warns_page",
+        "count_warns",
+        "count_all_warns",
+        "export_warns",
+        "get_guild_settings",
+        "get_many_guild_settings",
+        "top_xp",
+        "xp_rank",
+    )
+)
+
+
+class GlyphConnection(Connection):
+    """an asyncpg connection that carries its own prepared copy of every query in QUERIES."""
+
+    __slots__ = ("statements",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements: dict[str, PreparedStatement] = {}
+
+
+async def prepare_statements(conn: GlyphConnection) -> None:
+    """the pool's `init` hook. parses every query once per connection, so later calls only send arguments."""
+    for name, query in QUERIES.items():
+        conn.statements[name] = await conn.prepare(query)
+
+
+async def prepare_replica_statements(conn: GlyphConnection) -> None:
+    """the replica pool's `init` hook. like `prepare_statements`, but only for REPLICA_QUERIES."""
+    for name in REPLICA_QUERIES:
+        conn.statements[name] = await conn.prepare(QUERIES[name])
@@ -0,0 +1,235 @@
+from __future__ import annotations
+from asyncio import Lock, Task, create_task, sleep
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, Optional
+from cachetools import LRUCache
+
+from src.db.health import CircuitOpen, DatabaseUnavailable
+from src.metrics import LatencyTracker
+
+if TYPE_CHECKING:
+    from src.db import Database
+
+
+logger = getLogger(__name__)
+
+
+class XpBuffer:
+    """collects XP grants in memory and writes them to the database in batches.
+
+    grants for the same user are summed up and every `interval` seconds (or once `max_pending`
+    users are waiting) all of them are written with a single upsert. reads are answered from
+    the last total the database reported plus whatever is still waiting, so they stay correct
+    without a query.
+
+    if the process dies, at most the grants of the last `interval` seconds are lost, see `pending_xp`.
+    a flush that fails after it was sent (e.g. a timeout) isn't retried, since it may have
+    landed. its xp is counted in `uncertain_xp` instead.
+    """
+
+    __slots__ = (
+        "db",
+        "interval",
+        "max_pending",
+        "_pending",
+        "_flushing",
+        "_journaled",
+        "_known",
+        "_lock",
+        "_task",
+        "_flushes",
+        "flush_latency",
+        "last_flush_size",
+        "flushed_users",
+        "uncertain_xp",
+        "on_write",
+    )
+
+    def __init__(
+        self, db: Database, interval: float = 5.0, max_pending: int = 5000, cache_size: int = 50_000
+    ):
+        self.db = db
+        self.interval = interval
+        self.max_pending = max_pending
+        # xp granted since the last flush, by user
+        self._pending: dict[int, int] = {}
+        # xp that is being written right now
+        self._flushing: dict[int, int] = {}
+        # xp waiting in the database's write journal during an outage
+        self._journaled: dict[int, int] = {}
+        # the last total the database reported, by user
+        self._known: LRUCache[int, int] = LRUCache(maxsize=cache_size)
+        self._lock = Lock()
+        self._task: Optional[Task[None]] = None
+        # early flushes started by add(), referenced so they aren't garbage collected mid-write
+        self._flushes: set[Task[int]] = set()
+        self.flush_latency = LatencyTracker()
+        self.last_flush_size: int = 0
+        self.flushed_users: int = 0
+        # xp from failed flushes that may or may not have been written
+        self.uncertain_xp: int = 0
+        # called with the new (user_id, xp) totals after every write
+        self.on_write: Optional[Callable[[Iterable[Mapping[str, int]]], None]] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"failed to flush {len(self._pending)} xp grants: {e}")
+
+    @property
+    def pending_xp(self) -> int:
+        """xp that would be lost if the process died right now."""
+        # journaled grants are on disk, they survive
+        return sum(self._pending.values()) + sum(self._flushing.values())
+
+    async def _stored(self, user_id: int) -> int:
+        if user_id in self._flushing:
+            # the database is about to change under us, wait for the write to land
+            async with self._lock:
+                pass
+        if (xp := self._known.get(user_id)) is None:
+            xp = self._known[user_id] = await self.db.fetchval("get_xp", user_id) or 0
+        return xp
+
+    async def get(self, user_id: int) -> int:
+        stored = await self._stored(user_id)
+        return (
+            stored
+            + self._journaled.get(user_id, 0)
+            + self._flushing.get(user_id, 0)
+            + self._pending.get(user_id, 0)
+        )
+
+    async def add(self, user_id: int, xp: int) -> Optional[int]:
+        """grants xp and returns the user's new total.
+
+        the grant is kept either way. the total is None if it can't be read right now, e.g.
+        because the database is down and the user's stored xp isn't known.
+        """
+        self._pending[user_id] = self._pending.get(user_id, 0) + xp
+        if len(self._pending) >= self.max_pending and not self._lock.locked():
+            flush = create_task(self.flush())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushed)
+        try:
+            return await self.get(user_id)
+        except DatabaseUnavailable:
+            return None
+
+    def _flushed(self, flush: Task[int]) -> None:
+        self._flushes.discard(flush)
+        if not flush.cancelled() and (e := flush.exception()):
+            logger.error(f"failed to flush xp grants early: {e}")
+
+    async def set(self, user_id: int, xp: int) -> None:
+        """overwrites a user's xp right away, discarding any grants that haven't been written."""
+        async with self._lock:
+            self._pending.pop(user_id, None)
+            await self.db.fetch("set_xp", user_id, xp)
+            self._known[user_id] = xp
+        if self.on_write:
+            self.on_write(({"user_id": user_id, "xp": xp},))
+
+    async def flush(self) -> int:
+        """writes every waiting grant in one statement.
+
+        Returns:
+            int: how many users were written.
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            try:
+                with self.flush_latency.time():
+                    rows = await self.db.write(
+                        "fetch",
+                        "add_many_xp",
+                        list(self._flushing.keys()),
+                        list(self._flushing.values()),
+                    )
+                if rows is None:
+                    # the database is down and the grants went to the journal instead
+                    for user_id, xp in self._flushing.items():
+                        self._journaled[user_id] = self._journaled.get(user_id, 0) + xp
+                    return 0
+            except CircuitOpen:
+                # never sent, so the next flush can safely try again
+                for user_id, xp in self._flushing.items():
+                    self._pending[user_id] = self._pending.get(user_id, 0) + xp
+                raise
+            except Exception:
+                # e.g. a timeout: the write may have landed anyway, and retrying could grant
+                # the xp twice. drop it and read the totals again instead
+                for user_id in self._flushing:
+                    self._known.pop(user_id, None)
+                self.uncertain_xp += sum(self._flushing.values())
+                raise
+            finally:
+                self._flushing = {}
+            for row in rows:
+                self._known[row["user_id"]] = row["xp"]
+            self.last_flush_size = len(rows)
+            self.flushed_users += len(rows)
+        if self.on_write:
+            self.on_write(rows)
+        return len(rows)
+
+    def replayed(
+        self,
+        user_ids: list[int],
+        xps: list[int],
+        rows: Optional[Iterable[Mapping[str, int]]],
+        own: bool = True,
+    ) -> None:
+        """called when a journaled flush finally reached the database, with the totals it returned.
+
+        `rows` is None if the flush had already been applied by an earlier replay. `own` is
+        False for flushes journaled by a previous run, which this buffer never counted.
+        """
+        if own:
+            for user_id, xp in zip(user_ids, xps):
+                # may briefly go negative if the replay beats the flush that journaled it
+                if left := self._journaled.get(user_id, 0) - xp:
+                    self._journaled[user_id] = left
+                else:
+                    self._journaled.pop(user_id, None)
+        if rows is None:
+            # the totals we know may be from before the earlier replay, read them again
+            for user_id in user_ids:
+                self._known.pop(user_id, None)
+            return
+        for row in rows:
+            self._known[row["user_id"]] = row["xp"]
+        if self.on_write:
+            self.on_write(rows)
+
+    async def close(self) -> None:
+        """stops the background flushes and writes whatever is left."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # early flushes are left to finish, this one waits for them on the lock
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending_users": len(self._pending),
+            "pending_xp": self.pending_xp,
+            "journaled_users": len(self._journaled),
+            "last_flush_size": self.last_flush_size,
+            "flushed_users": self.flushed_users,
+            "uncertain_xp": self.uncertain_xp,
+            "max_loss_seconds": self.interval,
+            **{f"flush_{key}": value for key, value in self.flush_latency.summary().items()},
+        }
+
+    def __repr__(self):
+        return f"<XpBuffer(interval={self.interval}, pending_users={len(self._pending)})>"
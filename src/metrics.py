@@ -0,0 +1,60 @@
+from __future__ import annotations
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+
+class LatencyTracker:
+    """keeps the most recent timings of an operation and summarizes them as percentiles."""
+
+    __slots__ = ("samples", "count", "total", "slowest")
+
+    def __init__(self, window: int = 1000):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.slowest: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """times the body of a `with` block."""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(perf_counter() - started)
+
+    def percentile(self, percent: float) -> float:
+        """the given percentile, in seconds, over the recent window."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.slowest,
+        }
+
+    def format(self) -> str:
+        """a short human readable summary in milliseconds."""
+        summary = self.summary()
+        return (
+            f"n={summary['count']} p50={summary['p50'] * 1000:.1f}ms "
+            f"p95={summary['p95'] * 1000:.1f}ms max={summary['max'] * 1000:.1f}ms"
+        )
+
+    def __repr__(self):
+        return f"<LatencyTracker({self.format()})>"
@@ -1,11 +1,16 @@
+from typing import Optional
+
 from discord.ui import View, Button, button
 from discord import (
     ButtonStyle,
     PermissionOverwrite,
     Interaction,
     Embed,
+    Member,
 )
 
+from src.db import Database, Warn
+
 
 class VoteButtons(View):
     def __init__(self):
@@ -61,3 +66,76 @@ class TicketSettings(View):
         await interaction.response.send_message("Closing ticket", ephemeral=False)
         await interaction.channel.delete()  # type: ignore
         await interaction.user.send("Ticket closed.")
+
+
+class WarnPages(View):
+    """pages through a member's warns with previous/next buttons, one query per page.
+
+    only the cursor of each visited page is kept, never the warns themselves.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        member: Member,
+        author_id: int,
+        total: int,
+        page_size: int = 10,
+        archived: bool = False,
+    ):
+        super().__init__(timeout=300)
+        self.db = db
+        self.archived = archived
+        self.member = member
+        self.author_id = author_id
+        self.total = total
+        self.page_size = page_size
+        self.page = 0
+        # the (time, id) each visited page starts after, the first page starts at the top
+        self.cursors: list[Optional[tuple[int, int]]] = [None]
+        self.warns: list[Warn] = []
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    async def load(self) -> Embed:
+        """fetches the current page and returns its embed."""
+        self.warns = await self.db.get_warns_page(
+            self.member.id,
+            self.member.guild.id,
+            self.page_size,
+            self.cursors[self.page],
+            self.archived,
+        )
+        if self.warns and len(self.cursors) == self.page + 1:
+            last = self.warns[-1]
+            self.cursors.append((int(last.time), last.id))  # type: ignore
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page + 1 >= self.pages
+        return self.build_embed()
+
+    def build_embed(self) -> Embed:
+        embed = Embed(colour=0xffffff, title=f"Warnings for {self.member.name}")
+        start = self.page * self.page_size
+        for number, warn in enumerate(self.warns, start=start + 1):
+            embed.add_field(
+                name=f"Warning #{number} (ID {warn.id})",
+                value=f"**Reason:** {warn.reason} | **Date:** <t:{int(warn.time)}:F>",
+                inline=False,
+            )
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages} | {self.total} warnings")
+        return embed
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return interaction.user is not None and interaction.user.id == self.author_id
+
+    @button(label="Previous", style=ButtonStyle.gray)
+    async def previous_page(self, button: Button, interaction: Interaction):
+        self.page -= 1
+        await interaction.response.edit_message(embed=await self.load(), view=self)
+
+    @button(label="Next", style=ButtonStyle.gray)
+    async def next_page(self, button: Button, interaction: Interaction):
+        self.page += 1
+        await interaction.response.edit_message(embed=await self.load(), view=self)